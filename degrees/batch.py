@@ -0,0 +1,159 @@
+import csv
+import json
+import multiprocessing
+import os
+import signal
+import sys
+
+import degrees
+from util import SearchStats, phase
+
+# Worker processes answering queries; they share the loaded graph by forking
+WORKERS = os.cpu_count() or 1
+
+# Pairs handed to a worker at a time
+CHUNK_SIZE = 64
+
+# How names shared by several people are settled (see nameindex.POLICIES)
+POLICY = "most-films"
+
+
+def main():
+	args = sys.argv[1:]
+	profile = "--profile" in args
+	if profile:
+		args.remove("--profile")
+	if len(args) not in (1, 2):
+		sys.exit("Usage: python batch.py directory [pairs.tsv] [--profile]")
+	directory = args[0]
+
+	degrees.load_data(directory)
+
+	# Build the name index before forking, so every worker shares it
+	degrees.name_index()
+
+	answer = answer_profiled if profile else answer_pair
+	if len(args) == 2:
+		with open(args[1], encoding="utf-8", newline="") as f:
+			run(read_pairs(f), sys.stdout, answer)
+	else:
+		run(read_pairs(sys.stdin), sys.stdout, answer)
+
+
+def read_pairs(f):
+	"""
+	Yields (source, target) pairs from tab-separated lines of `f`,
+	skipping blank lines.
+	"""
+	for row in csv.reader(f, delimiter="\t"):
+		if not row or not any(field.strip() for field in row):
+			continue
+		if len(row) != 2:
+			yield None
+		else:
+			yield row[0].strip(), row[1].strip()
+
+
+def run(pairs, out, answer=None, workers=WORKERS):
+	"""
+	Answers every pair with `answer` (answer_pair by default) and writes
+	one JSON result per line to `out`, in input order, as soon as each
+	one is ready.
+	"""
+	answer = answer or answer_pair
+	if workers > 1:
+		with fork_pool(workers) as pool:
+			for result in pool.imap(answer, pairs, CHUNK_SIZE):
+				write(result, out)
+	else:
+		for pair in pairs:
+			write(answer(pair), out)
+
+
+def fork_pool(workers):
+	"""
+	Returns a process pool whose workers are forked from this process,
+	so they inherit the already loaded graph instead of reloading it.
+	"""
+	return multiprocessing.get_context("fork").Pool(workers, initializer=ignore_interrupts)
+
+
+def ignore_interrupts():
+	# Ctrl-C is handled by the parent, which shuts the pool down
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def write(result, out):
+	out.write(json.dumps(result) + "\n")
+	out.flush()
+
+
+def answer_pair(pair, stats=None):
+	if pair is None:
+		return {"error": "Expected two tab-separated names."}
+	return answer(*pair, stats=stats)
+
+
+def answer_profiled(pair):
+	"""
+	Like answer_pair, but adds the query's SearchStats to the result.
+	"""
+	stats = SearchStats()
+	result = answer_pair(pair, stats)
+	result["stats"] = stats.as_dict()
+	return result
+
+
+def answer(source, target, stats=None):
+	"""
+	Returns a JSON-ready dict describing the shortest path between
+	the people named (or IMDB ids given by) `source` and `target`.
+	"""
+	result = {"source": source, "target": target}
+	try:
+		with phase(stats, "lookup"):
+			source_id = resolve(source)
+			target_id = resolve(target)
+	except LookupError as e:
+		result["error"] = str(e)
+		return result
+	result["source_id"] = source_id
+	result["target_id"] = target_id
+
+	path = degrees.shortest_path(source_id, target_id, bidirectional=True, stats=stats)
+	graph = degrees.graph
+	if path is None:
+		result["degrees"] = None
+		result["path"] = None
+	else:
+		result["degrees"] = len(path)
+		result["path"] = [
+			{
+				"movie_id": movie_id,
+				"title": graph.movie_titles[graph.movie(movie_id)],
+				"person_id": person_id,
+				"name": graph.person_names[graph.person(person_id)]
+			}
+			for movie_id, person_id in path
+		]
+	return result
+
+
+def resolve(name):
+	"""
+	Returns the IMDB id for `name` without prompting. `name` may also
+	be an IMDB id, or end in a "(1958)" birth year hint. Misspelt names
+	fall back to the closest fuzzy match, and names shared by several
+	people are settled by POLICY. Raises LookupError if nobody matches.
+	"""
+	graph = degrees.graph
+	if name in graph.person_index:
+		return name
+	person = degrees.name_index().resolve(name, POLICY)
+	if person is not None:
+		return graph.person_ids[person]
+	raise LookupError(f"Person not found: '{name}'")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,148 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+import degrees
+import landmarks
+from util import SearchStats
+
+# Long-path queries against the `small` directory, as (source, target) person ids
+SMALL_QUERIES = [
+	("102", "705"),      # Kevin Bacon -> Robin Wright
+	("420", "1697"),     # Valeria Golino -> Chris Sarandon
+	("596520", "144"),   # Gerald R. Molen -> Cary Elwes
+	("163", "914612"),   # Dustin Hoffman -> Emma Watson (not connected)
+]
+
+# Shape of the synthetic dataset: a chain of communities joined by bridge movies
+COMMUNITIES = 12
+PEOPLE_PER_COMMUNITY = 2000
+MOVIES_PER_COMMUNITY = 1500
+CAST_SIZE = 6
+SEED = 50
+
+REPEAT = 3
+
+# Landmarks indexed before timing the landmark-guided search
+LANDMARKS = 8
+
+
+def main():
+	if len(sys.argv) > 2:
+		sys.exit("Usage: python benchmark.py [scale]")
+	scale = float(sys.argv[1]) if len(sys.argv) == 2 else 1.0
+
+	run("small", "small", SMALL_QUERIES)
+
+	with tempfile.TemporaryDirectory() as directory:
+		queries = generate(directory, scale)
+		run("synthetic", directory, queries)
+
+
+def run(label, directory, queries):
+	"""
+	Load `directory`, answer every query `REPEAT` times and print
+	how many nodes were expanded per second.
+	"""
+	start = time.perf_counter()
+	degrees.load_data(directory)
+	load_time = time.perf_counter() - start
+
+	graph = degrees.graph
+	print(f"{label}: {graph.num_people} people, {graph.num_movies} movies, loaded in {load_time:.2f}s")
+
+	start = time.perf_counter()
+	degrees.landmarks = landmarks.build_index(graph, LANDMARKS)
+	print(f"  indexed {LANDMARKS} landmarks in {time.perf_counter() - start:.2f}s")
+
+	searches = {
+		"forward": degrees.breadth_first_search,
+		"bidirectional": degrees.bidirectional_search,
+		"landmark": degrees.landmark_search
+	}
+	queries = [(graph.person(source), graph.person(target)) for source, target in queries]
+
+	for mode, search in searches.items():
+		stats = SearchStats()
+		start = time.perf_counter()
+		for _ in range(REPEAT):
+			for source, target in queries:
+				search(source, target, stats)
+		search_time = time.perf_counter() - start
+
+		expanded = stats.nodes_expanded
+		print(f"  {mode}: {REPEAT * len(queries)} queries in {search_time:.3f}s")
+		print(f"    {expanded} nodes expanded, {expanded / search_time:,.0f} nodes/s")
+
+
+def generate(directory, scale):
+	"""
+	Write a synthetic people/movies/stars dataset into `directory`.
+
+	People are split into communities with dense casts inside each one,
+	and community `i` is only linked to community `i + 1` through a single
+	bridge movie, so queries between the two ends need many hops.
+	Returns the list of (source, target) queries to benchmark.
+	"""
+	rng = random.Random(SEED)
+	people_per_community = max(CAST_SIZE, int(PEOPLE_PER_COMMUNITY * scale))
+	movies_per_community = max(1, int(MOVIES_PER_COMMUNITY * scale))
+
+	communities = []
+	with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(["id", "name", "birth"])
+		for c in range(COMMUNITIES):
+			community = [str(c * people_per_community + i + 1) for i in range(people_per_community)]
+			for person_id in community:
+				writer.writerow([person_id, f"Person {person_id}", 1900 + rng.randrange(100)])
+			communities.append(community)
+		# One person who never starred in anything, for a not-connected query
+		loner = str(COMMUNITIES * people_per_community + 1)
+		writer.writerow([loner, f"Person {loner}", 1950])
+
+	stars = []
+	movie_ids = []
+	for c, community in enumerate(communities):
+		# The first casts cover everyone once, so nobody in a community is left out
+		shuffled = rng.sample(community, len(community))
+		casts = [shuffled[i:i + CAST_SIZE] for i in range(0, len(shuffled), CAST_SIZE)]
+		while len(casts) < movies_per_community:
+			casts.append(rng.sample(community, CAST_SIZE))
+		for cast in casts:
+			movie_id = str(len(movie_ids) + 1)
+			movie_ids.append(movie_id)
+			for person_id in cast:
+				stars.append((person_id, movie_id))
+		if c + 1 < len(communities):
+			movie_id = str(len(movie_ids) + 1)
+			movie_ids.append(movie_id)
+			stars.append((community[-1], movie_id))
+			stars.append((communities[c + 1][0], movie_id))
+
+	with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(["id", "title", "year"])
+		for movie_id in movie_ids:
+			writer.writerow([movie_id, f"Movie {movie_id}", 1950 + rng.randrange(70)])
+
+	with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(["person_id", "movie_id"])
+		writer.writerows(stars)
+
+	first, last = communities[0], communities[-1]
+	middle = communities[len(communities) // 2]
+	return [
+		(first[1], last[-2]),
+		(first[2], middle[1]),
+		(middle[2], last[1]),
+		(first[3], loner),
+	]
+
+
+if __name__ == "__main__":
+	main()
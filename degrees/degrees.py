@@ -1,75 +1,60 @@
-import csv
 import sys
+from array import array
 
-from util import Node, StackFrontier, QueueFrontier
+from landmarks import build_index, guided_search, load_index
+from nameindex import NameIndex, split_birth_hint
+from snapshot import open_graph
+from util import Node, StackFrontier, QueueFrontier, SearchStats, phase
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Person <-> movie graph, filled in by load_data
+graph = None
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Landmark distance index, if one was built for the loaded directory
+landmarks = None
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Prefix and fuzzy name index, built on first use by name_index
+names = None
 
 
 def load_data(directory):
 	"""
-	Load data from CSV files into memory.
-	"""
-	# Load people
-	with open(f'{directory}/people.csv', encoding="utf-8") as f:
-		reader = csv.DictReader(f)
-		for row in reader:
-			people[row["id"]] = {
-				"name": row["name"],
-				"birth": row["birth"],
-				"movies": set()
-			}
-			if row["name"].lower() not in names:
-				names[row["name"].lower()] = {row["id"]}
-			else:
-				names[row["name"].lower()].add(row["id"])
-
-	# Load movies
-	with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-		reader = csv.DictReader(f)
-		for row in reader:
-			movies[row["id"]] = {
-				"title": row["title"],
-				"year": row["year"],
-				"stars": set()
-			}
-
-	# Load stars
-	with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-		reader = csv.DictReader(f)
-		for row in reader:
-			try:
-				people[row["person_id"]]["movies"].add(row["movie_id"])
-				movies[row["movie_id"]]["stars"].add(row["person_id"])
-			except KeyError:
-				pass
+	Load data from CSV files into memory, or from the directory's
+	binary snapshot if the CSVs have not changed since it was written.
+	"""
+	global graph, landmarks, names
+	graph = open_graph(directory)
+	landmarks = load_index(directory)
+	names = None
 
 
 def main():
-	if len(sys.argv) > 2:
-		sys.exit("Usage: python degrees.py [directory]")
-	directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+	args = sys.argv[1:]
+	profile = "--profile" in args
+	if profile:
+		args.remove("--profile")
+	if len(args) > 1:
+		sys.exit("Usage: python degrees.py [directory] [--profile]")
+	directory = args[0] if len(args) == 1 else "large"
+	stats = SearchStats() if profile else None
 
 	# Load data from files into memory
 	print("Loading data...")
-	load_data(directory)
+	with phase(stats, "load"):
+		load_data(directory)
 	print("Data loaded.")
 
-	source = person_id_for_name(input("Name: "))
+	name = input("Name: ")
+	with phase(stats, "lookup"):
+		source = person_id_for_name(name)
 	if source is None:
 		sys.exit("Person not found.")
-	target = person_id_for_name(input("Name: "))
+	name = input("Name: ")
+	with phase(stats, "lookup"):
+		target = person_id_for_name(name)
 	if target is None:
 		sys.exit("Person not found.")
 
-	path = shortest_path(source, target)
+	path = shortest_path(source, target, stats=stats)
 
 	if path is None:
 		print("Not connected.")
@@ -78,74 +63,321 @@ def main():
 		print(f"{degrees} degrees of separation.")
 		path = [(None, source)] + path
 		for i in range(degrees):
-			person1 = people[path[i][1]]["name"]
-			person2 = people[path[i + 1][1]]["name"]
-			movie = movies[path[i + 1][0]]["title"]
+			person1 = graph.person_names[graph.person(path[i][1])]
+			person2 = graph.person_names[graph.person(path[i + 1][1])]
+			movie = graph.movie_titles[graph.movie(path[i + 1][0])]
 			print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
+	if stats is not None:
+		print(stats.report())
+
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, guided=False, stats=None):
 	"""
 	Returns the shortest list of (movie_id, person_id) pairs
 	that connect the source to the target.
 
+	If `bidirectional` is true, searches from both ends at once
+	(see `bidirectional_search`). Otherwise, if `guided` is true,
+	runs an A* search guided by the landmark index (see
+	`landmark_search`), and a breadth-first search if not.
+	If a landmark index was loaded, unconnected pairs are answered
+	from it without searching.
+	If a SearchStats is given as `stats`, it records what the search did.
+
 	If no possible path, returns None.
 	"""
+	if source == target:
+		return []
 
-	frontier=QueueFrontier()   # Breadth First Search will automatically give us the shortest path 
-	ids_explored=[]
-	start_node=Node(parent=None,person_id=source,movie_id=None)
-	frontier.add(start_node)
+	if bidirectional:
+		search = bidirectional_search
+	elif guided:
+		search = landmark_search
+	else:
+		search = breadth_first_search
+	source, target = graph.person(source), graph.person(target)
+	with phase(stats, "search"):
+		if landmarks is not None and landmarks.bounds(source, target) is None:
+			return None
+		path = search(source, target, stats)
+		if path is None:
+			return None
+		with phase(stats, "path"):
+			return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
 
-	global flag
-	flag=0
 
-	while flag==0:
-		if frontier.empty():
-			return None
-		p=frontier.remove()                        # p is a node
-		ids_explored.append(p.person_id)           # to prevent exploring the same person and ending up in a loop 
-		for neighbor in neighbors_for_person(p.person_id):
-			if neighbor[1]==target:
-				target_node=Node(parent=p,person_id=target,movie_id=neighbor[0])
-				flag=1
-				break
-			elif neighbor[1] not in ids_explored:
-				frontier.add(Node(parent=p,person_id=neighbor[1],movie_id=neighbor[0]))
+def breadth_first_search(source, target, stats=None):
+	"""
+	Returns the shortest list of (movie, person) int pairs
+	that connect the source to the target, or None.
+	"""
+	if source == target:
+		return []
+
+	frontier = QueueFrontier()   # Breadth First Search will automatically give us the shortest path
+	frontier.add(Node(person_id=source, movie_id=None, parent=None))
+	if stats is not None:
+		stats.queued(0)
+
+	# People are marked when they are queued, not when they are explored,
+	# so nobody is ever added to the frontier twice. Movies are marked too:
+	# once a cast has been scanned, rescanning it can only find people
+	# who are already queued.
+	seen = {source}
+	seen_movies = set()
+
+	while not frontier.empty():
+		node = frontier.remove()
+		if stats is not None:
+			stats.nodes_expanded += 1
+		for movie, person in graph.costars(node.person_id, seen_movies):
+			if stats is not None:
+				stats.neighbors_generated += 1
+			if person in seen:
+				continue
+			child = Node(person_id=person, movie_id=movie, parent=node)
+			if person == target:
+				with phase(stats, "path"):
+					return path_to(child)
+			seen.add(person)
+			frontier.add(child)
+			if stats is not None:
+				stats.queued(child.depth)
+
+	return None
+
+
+def landmark_search(source, target, stats=None):
+	"""
+	Returns the shortest list of (movie, person) int pairs
+	that connect the source to the target, using the landmark index
+	to rule out unconnected pairs up front and to steer the search
+	towards the target. The index is built first if none was loaded
+	(see `landmark_index`).
 
-	final_list=[]
-	node =target_node
-	
-	while node!=start_node:
-		final_list.append((node.movie_id,node.person_id))
-		node=node.parent
+	If no possible path, returns None.
+	"""
+	if source == target:
+		return []
+	node = guided_search(graph, landmark_index(), source, target, stats)
+	if node is None:
+		return None
+	with phase(stats, "path"):
+		return path_to(node)
 
-	final_list.reverse()
 
-	return final_list
+def distance_bounds(source, target):
+	"""
+	Returns (lower, upper) bounds on the degrees of separation between
+	two IMDB ids from the landmark index, without searching. `upper`
+	is None if unknown. Returns None if they are not connected.
+	The index is built first if none was loaded (see `landmark_index`).
+	"""
+	return landmark_index().bounds(graph.person(source), graph.person(target))
 
-			
 
+def bidirectional_search(source, target, stats=None):
+	"""
+	Returns the shortest list of (movie, person) int pairs
+	that connect the source to the target, growing one search tree
+	from each end and always expanding a whole level of whichever
+	frontier is smaller, until the two trees touch.
+
+	If no possible path, returns None.
+	"""
+	if source == target:
+		return []
+
+	# Each side maps every person it has reached to their Node. On the
+	# target side a node's parent is the next person on the way to `target`.
+	forward = {source: Node(person_id=source, movie_id=None, parent=None)}
+	backward = {target: Node(person_id=target, movie_id=None, parent=None)}
+	forward_level = [forward[source]]
+	backward_level = [backward[target]]
+	forward_movies = set()
+	backward_movies = set()
+	if stats is not None:
+		stats.queued(0)
+		stats.queued(0, backward=True)
+
+	while forward_level and backward_level:
+		if len(forward_level) <= len(backward_level):
+			forward_level, meetings = expand_level(forward_level, forward, backward, forward_movies, stats)
+		else:
+			backward_level, meetings = expand_level(backward_level, backward, forward, backward_movies, stats, True)
+			meetings = [(other, movie, node) for node, movie, other in meetings]
+		if meetings:
+			# Every meeting in this level is a candidate; keep the shortest
+			forward_node, movie, backward_node = min(
+				meetings, key=lambda meeting: meeting[0].depth + meeting[2].depth
+			)
+			with phase(stats, "path"):
+				return join_paths(forward_node, movie, backward_node)
+
+	return None
+
+
+def expand_level(level, reached, other, seen_movies, stats=None, backward=False):
+	"""
+	Expands every node in `level`, recording newly reached people in
+	`reached` and scanned movies in `seen_movies`. Returns the next level
+	and the list of (node, movie, other_node) meetings with people
+	already reached by the `other` side.
+	"""
+	next_level = []
+	meetings = []
+	for node in level:
+		if stats is not None:
+			stats.nodes_expanded += 1
+		for movie, person in graph.costars(node.person_id, seen_movies):
+			if stats is not None:
+				stats.neighbors_generated += 1
+			if person in other:
+				meetings.append((node, movie, other[person]))
+			elif person not in reached:
+				child = Node(person_id=person, movie_id=movie, parent=node)
+				reached[person] = child
+				next_level.append(child)
+				if stats is not None:
+					stats.queued(child.depth, backward)
+	return next_level, meetings
+
+
+def join_paths(forward_node, movie, backward_node):
+	"""
+	Returns the path through `forward_node`, then `movie` to
+	`backward_node`, then along `backward_node`'s parents to the target.
+	"""
+	path = path_to(forward_node)
+	path.append((movie, backward_node.person_id))
+	node = backward_node
+	while node.parent is not None:
+		path.append((node.movie_id, node.parent.person_id))
+		node = node.parent
+	return path
 
 
-	# TODO
-	raise NotImplementedError
+def path_to(node):
+	"""
+	Returns the list of (movie, person) pairs that lead
+	from the root of the search to `node`.
+	"""
+	path = []
+	while node.parent is not None:
+		path.append((node.movie_id, node.person_id))
+		node = node.parent
+	path.reverse()
+	return path
 
 
-def person_id_for_name(name):
+def shortest_paths(source, targets):
+	"""
+	Returns a dict mapping each IMDB id in `targets` to its shortest
+	list of (movie_id, person_id) pairs from `source` (None if not
+	connected), all from a single breadth-first search.
+	"""
+	source = graph.person(source)
+	wanted = {graph.person(target) for target in targets}
+	reached, _ = explore(source, wanted)
+
+	paths = {}
+	for target in targets:
+		node = reached.get(graph.person(target))
+		if node is None:
+			paths[target] = None
+		else:
+			paths[target] = [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path_to(node)]
+	return paths
+
+
+def distance_histogram(source, targets=None):
+	"""
+	Returns a dict mapping degrees of separation to how many of
+	`targets` (everyone, if None) are that far from `source`.
+	People who are not connected are counted under None.
+	"""
+	source = graph.person(source)
+	if targets is None:
+		_, distance = explore(source)
+		people = range(graph.num_people)
+	else:
+		people = [graph.person(target) for target in targets]
+		_, distance = explore(source, set(people))
+
+	histogram = {}
+	for person in people:
+		degrees = distance[person] if distance[person] >= 0 else None
+		histogram[degrees] = histogram.get(degrees, 0) + 1
+	return histogram
+
+
+def distances(source):
+	"""
+	Returns an array holding the degrees of separation from `source`
+	to every person, indexed like `graph.person_ids` (-1 if not connected).
+	"""
+	_, distance = explore(graph.person(source))
+	return distance
+
+
+def explore(source, targets=None):
+	"""
+	Runs one breadth-first search from person `source`, stopping early
+	once everyone in `targets` (if given) has been reached.
+
+	Returns (reached, distance): `reached` maps every person reached to
+	their Node, and `distance` is an array of hops from `source` for
+	every person, -1 for people not reached.
+	"""
+	distance = array("i", [-1]) * graph.num_people
+	distance[source] = 0
+	start = Node(person_id=source, movie_id=None, parent=None)
+	reached = {source: start}
+	remaining = None if targets is None else set(targets) - {source}
+
+	seen_movies = set()
+
+	frontier = QueueFrontier()
+	frontier.add(start)
+	while not frontier.empty() and remaining != set():
+		node = frontier.remove()
+		for movie, person in graph.costars(node.person_id, seen_movies):
+			if person in reached:
+				continue
+			child = Node(person_id=person, movie_id=movie, parent=node)
+			reached[person] = child
+			distance[person] = distance[node.person_id] + 1
+			frontier.add(child)
+			if remaining is not None:
+				remaining.discard(person)
+
+	return reached, distance
+
+
+def person_id_for_name(name, policy=None):
 	"""
 	Returns the IMDB id for a person's name,
 	resolving ambiguities as needed.
+
+	If `policy` is given (see nameindex.POLICIES), ambiguities are
+	resolved without prompting, and a trailing "(1958)" on the name is
+	used as a birth year hint.
 	"""
-	person_ids = list(names.get(name.lower(), set()))
+	if policy is not None:
+		name, birth = split_birth_hint(name)
+		person = name_index().choose(graph.people_named(name), policy, birth)
+		return None if person is None else graph.person_ids[person]
+
+	person_ids = [graph.person_ids[person] for person in graph.people_named(name)]
 	if len(person_ids) == 0:
 		return None
 	elif len(person_ids) > 1:
 		print(f"Which '{name}'?")
 		for person_id in person_ids:
-			person = people[person_id]
-			name = person["name"]
-			birth = person["birth"]
+			person = graph.person(person_id)
+			name = graph.person_names[person]
+			birth = graph.person_births[person]
 			print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
 		try:
 			person_id = input("Intended Person ID: ")
@@ -158,17 +390,36 @@ def person_id_for_name(name):
 		return person_ids[0]
 
 
+def name_index():
+	"""
+	Returns the NameIndex for the loaded graph, building it on first use.
+	"""
+	global names
+	if names is None:
+		names = NameIndex(graph)
+	return names
+
+
+def landmark_index():
+	"""
+	Returns the LandmarkIndex loaded for the graph. If the directory
+	had none, builds one in memory on first use, which takes one
+	breadth-first search per landmark; run `python landmarks.py
+	directory` to build it once and save it instead.
+	"""
+	global landmarks
+	if landmarks is None:
+		landmarks = build_index(graph)
+	return landmarks
+
+
 def neighbors_for_person(person_id):
 	"""
-	Returns (movie_id, person_id) pairs for people
+	Yields (movie_id, person_id) pairs for people
 	who starred with a given person.
 	"""
-	movie_ids = people[person_id]["movies"]
-	neighbors = set()
-	for movie_id in movie_ids:
-		for person_id in movies[movie_id]["stars"]:
-			neighbors.add((movie_id, person_id))
-	return neighbors
+	for movie, person in graph.neighbors(graph.person(person_id)):
+		yield graph.movie_ids[movie], graph.person_ids[person]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+import csv
+from array import array
+
+# Typecode for every offset and index array (32-bit signed ints)
+INDEX_TYPE = "i"
+
+
+class Graph():
+	"""
+	Bipartite person <-> movie graph.
+
+	IMDB ids are interned to dense ints (a person's or movie's position in
+	`person_ids` / `movie_ids`), and the star relation is stored twice in
+	compressed sparse row form: the movies of person `p` are
+	`person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the stars
+	of movie `m` are `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+	"""
+
+	def __init__(self, person_ids, person_names, person_births,
+	             movie_ids, movie_titles, movie_years,
+	             person_offsets, person_movies, movie_offsets, movie_stars,
+	             person_index, movie_index, names, name_postings=None):
+		self.person_ids = person_ids
+		self.person_names = person_names
+		self.person_births = person_births
+		self.movie_ids = movie_ids
+		self.movie_titles = movie_titles
+		self.movie_years = movie_years
+		self.person_offsets = person_offsets
+		self.person_movies = person_movies
+		self.movie_offsets = movie_offsets
+		self.movie_stars = movie_stars
+
+		# Map IMDB person and movie ids to their ints
+		self.person_index = person_index
+		self.movie_index = movie_index
+
+		# Maps a lowercase name to the list of people (ints) with that name
+		self.names = names
+
+		# Trigram Postings of the names for NameIndex, built on first use
+		# unless a snapshot stored them
+		self.name_postings = name_postings
+
+	@property
+	def num_people(self):
+		return len(self.person_ids)
+
+	@property
+	def num_movies(self):
+		return len(self.movie_ids)
+
+	def person(self, person_id):
+		"""
+		Returns the int for IMDB `person_id`, raising KeyError if unknown.
+		"""
+		return self.person_index[person_id]
+
+	def movie(self, movie_id):
+		"""
+		Returns the int for IMDB `movie_id`, raising KeyError if unknown.
+		"""
+		return self.movie_index[movie_id]
+
+	def people_named(self, name):
+		"""
+		Returns the people (ints) whose name matches `name`, ignoring case.
+		"""
+		return list(self.names.get(name.lower(), ()))
+
+	def movies_of(self, person):
+		return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+	def stars_of(self, movie):
+		return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+	def neighbors(self, person):
+		"""
+		Yields (movie, person) int pairs for everyone who starred
+		with `person`, including `person` themselves.
+		"""
+		for movie in self.movies_of(person):
+			for star in self.stars_of(movie):
+				yield movie, star
+
+	def costars(self, person, seen_movies):
+		"""
+		Yields (movie, person) int pairs like `neighbors`, but only for
+		movies not already in the set `seen_movies`, adding each movie
+		to it. A breadth-first search sharing one `seen_movies` set scans
+		every cast at most once, however many of its stars it expands.
+		"""
+		for movie in self.movies_of(person):
+			if movie in seen_movies:
+				continue
+			seen_movies.add(movie)
+			for star in self.stars_of(movie):
+				yield movie, star
+
+
+def load_graph(directory):
+	"""
+	Load people.csv, movies.csv and stars.csv from `directory`
+	into a Graph.
+	"""
+	person_ids = []
+	person_names = []
+	person_births = []
+	person_index = {}
+	names = {}
+	with open(f"{directory}/people.csv", encoding="utf-8") as f:
+		reader = csv.DictReader(f)
+		for row in reader:
+			person = len(person_ids)
+			person_index[row["id"]] = person
+			person_ids.append(row["id"])
+			person_names.append(row["name"])
+			person_births.append(row["birth"])
+			names.setdefault(row["name"].lower(), []).append(person)
+
+	movie_ids = []
+	movie_titles = []
+	movie_years = []
+	movie_index = {}
+	with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+		reader = csv.DictReader(f)
+		for row in reader:
+			movie_index[row["id"]] = len(movie_ids)
+			movie_ids.append(row["id"])
+			movie_titles.append(row["title"])
+			movie_years.append(row["year"])
+
+	# Collect (person, movie) edges, skipping unknown ids and duplicate rows
+	edge_people = array(INDEX_TYPE)
+	edge_movies = array(INDEX_TYPE)
+	seen = set()
+	with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+		reader = csv.DictReader(f)
+		for row in reader:
+			try:
+				person = person_index[row["person_id"]]
+				movie = movie_index[row["movie_id"]]
+			except KeyError:
+				continue
+			edge = person * len(movie_ids) + movie
+			if edge in seen:
+				continue
+			seen.add(edge)
+			edge_people.append(person)
+			edge_movies.append(movie)
+	del seen
+
+	person_offsets, person_movies = compress(len(person_ids), edge_people, edge_movies)
+	movie_offsets, movie_stars = compress(len(movie_ids), edge_movies, edge_people)
+
+	return Graph(
+		person_ids, person_names, person_births,
+		movie_ids, movie_titles, movie_years,
+		person_offsets, person_movies, movie_offsets, movie_stars,
+		person_index, movie_index, names
+	)
+
+
+def compress(count, rows, columns):
+	"""
+	Returns (offsets, indices) arrays in compressed sparse row form
+	for the edges `rows[i] -> columns[i]` over `count` rows.
+	"""
+	offsets = array(INDEX_TYPE, bytes(array(INDEX_TYPE).itemsize * (count + 1)))
+	for row in rows:
+		offsets[row + 1] += 1
+	for row in range(count):
+		offsets[row + 1] += offsets[row]
+
+	indices = array(INDEX_TYPE, bytes(array(INDEX_TYPE).itemsize * len(rows)))
+	position = offsets[:-1]
+	for row, column in zip(rows, columns):
+		indices[position[row]] = column
+		position[row] += 1
+	return offsets, indices
@@ -0,0 +1,247 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+
+from snapshot import source_stats
+from util import Node
+
+INDEX_NAME = "landmarks.index"
+
+# Number of landmarks picked when building an index
+LANDMARKS = 16
+
+# Stored distance for people a landmark cannot reach
+UNREACHABLE = 255
+
+# Stored distance for people at least this far from a landmark
+FAR = UNREACHABLE - 1
+
+MAGIC = b"LANDMRK\x01"
+
+# Magic, then (mtime_ns, size) of each source CSV, then landmark and people counts
+HEADER = struct.Struct("<8s6qqq")
+
+
+def main():
+	if len(sys.argv) not in (2, 3):
+		sys.exit("Usage: python landmarks.py directory [count]")
+	directory = sys.argv[1]
+	count = int(sys.argv[2]) if len(sys.argv) == 3 else LANDMARKS
+
+	# Imported here so the indexer loads data exactly the way degrees.py does
+	import degrees
+	degrees.load_data(directory)
+
+	index = build_index(degrees.graph, count)
+	write_index(directory, index, source_stats(directory))
+	print(f"Wrote {len(index.landmarks)} landmarks to {index_path(directory)}")
+
+
+class LandmarkIndex():
+	"""
+	Degrees of separation from a few landmark people to everyone.
+
+	`distances[i][p]` is the number of hops from `landmarks[i]` to
+	person `p`, FAR for anyone at least that far away, and UNREACHABLE
+	if they are not connected. By the triangle inequality, for every
+	landmark `L`,
+
+		|d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+	"""
+
+	def __init__(self, landmarks, distances):
+		self.landmarks = landmarks
+		self.distances = distances
+
+	def bounds(self, source, target):
+		"""
+		Returns (lower, upper) bounds on the degrees of separation
+		between people `source` and `target`, in O(landmarks).
+
+		`upper` is None if no landmark reaches both of them. Returns
+		None if some landmark reaches exactly one of them, which means
+		they are not connected.
+		"""
+		if source == target:
+			return 0, 0
+		lower = 1
+		upper = None
+		for row in self.distances:
+			s, t = row[source], row[target]
+			if s == UNREACHABLE and t == UNREACHABLE:
+				continue
+			if s == UNREACHABLE or t == UNREACHABLE:
+				return None
+			lower = max(lower, abs(s - t))
+			if s < FAR and t < FAR and (upper is None or s + t < upper):
+				upper = s + t
+		return lower, upper
+
+	def heuristic(self, target):
+		"""
+		Returns a function estimating the hops from a person to
+		`target`. The estimate never overshoots, and is None for
+		people who cannot be connected to `target`.
+		"""
+		rows = [(row, row[target]) for row in self.distances]
+
+		def estimate(person):
+			best = 0
+			for row, t in rows:
+				p = row[person]
+				if (p == UNREACHABLE) != (t == UNREACHABLE):
+					return None
+				if p != UNREACHABLE and abs(p - t) > best:
+					best = abs(p - t)
+			return best
+
+		return estimate
+
+
+def guided_search(graph, index, source, target, stats=None):
+	"""
+	Runs an A* search from person `source` to person `target`, using
+	the landmark lower bounds as heuristic and pruning people whose
+	best possible path is longer than the landmark upper bound.
+	If a SearchStats is given as `stats`, it records what the search did.
+
+	Returns the target's Node, or None if not connected.
+	"""
+	bounds = index.bounds(source, target)
+	if bounds is None:
+		return None
+	upper = bounds[1]
+	estimate = index.heuristic(target)
+
+	start = Node(person_id=source, movie_id=None, parent=None)
+	best = {source: 0}
+	frontier = [(estimate(source), 0, 0, start)]
+	pushed = 1
+	if stats is not None:
+		stats.queued(0)
+
+	while frontier:
+		_, depth, _, node = heapq.heappop(frontier)
+		hops = -depth
+		if node.person_id == target:
+			return node
+		if hops > best[node.person_id]:
+			continue
+		if stats is not None:
+			stats.nodes_expanded += 1
+		for movie, person in graph.neighbors(node.person_id):
+			if stats is not None:
+				stats.neighbors_generated += 1
+			if hops + 1 >= best.get(person, hops + 2):
+				continue
+			h = estimate(person)
+			if h is None or (upper is not None and hops + 1 + h > upper):
+				continue
+			best[person] = hops + 1
+			child = Node(person_id=person, movie_id=movie, parent=node)
+			# Ties prefer deeper nodes, which are closer to the target
+			heapq.heappush(frontier, (hops + 1 + h, -(hops + 1), pushed, child))
+			pushed += 1
+			if stats is not None:
+				stats.queued(hops + 1)
+
+	return None
+
+
+def build_index(graph, count=LANDMARKS):
+	"""
+	Picks the `count` people with the most co-star links as landmarks
+	and records the degrees of separation from each of them.
+	"""
+	degree = [
+		sum(len(graph.stars_of(movie)) for movie in graph.movies_of(person))
+		for person in range(graph.num_people)
+	]
+	landmarks = heapq.nlargest(count, range(graph.num_people), key=degree.__getitem__)
+	return LandmarkIndex(
+		array("i", landmarks),
+		[hops_from(graph, landmark) for landmark in landmarks]
+	)
+
+
+def hops_from(graph, source):
+	"""
+	Returns an array('B') of hops from person `source` to everyone,
+	capped at FAR, and UNREACHABLE if not connected.
+	"""
+	distance = array("B", [UNREACHABLE]) * graph.num_people
+	distance[source] = 0
+	seen_movies = set()
+	queue = deque([source])
+	while queue:
+		person = queue.popleft()
+		hops = min(distance[person] + 1, FAR)
+		for movie, star in graph.costars(person, seen_movies):
+			if distance[star] == UNREACHABLE:
+				distance[star] = hops
+				queue.append(star)
+	return distance
+
+
+def index_path(directory):
+	return os.path.join(directory, INDEX_NAME)
+
+
+def load_index(directory):
+	"""
+	Memory-maps the landmark index in `directory`.
+
+	Returns None if there is no index, or it was built from
+	CSVs whose mtime or size has since changed.
+	"""
+	try:
+		stats = source_stats(directory)
+		with open(index_path(directory), "rb") as f:
+			buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	except (OSError, ValueError):
+		return None
+
+	view = memoryview(buffer)
+	header = HEADER.unpack_from(view) if len(view) >= HEADER.size else None
+	if header is None or header[0] != MAGIC or header[1:7] != stats:
+		view.release()
+		buffer.close()
+		return None
+
+	count, people = header[7], header[8]
+	position = HEADER.size
+	landmarks = view[position:position + 4 * count].cast("i")
+	position += 4 * count
+	distances = [
+		view[position + i * people:position + (i + 1) * people]
+		for i in range(count)
+	]
+	return LandmarkIndex(landmarks, distances)
+
+
+def write_index(directory, index, stats):
+	"""
+	Writes `index` next to the CSVs in `directory`, recording
+	the source CSV `stats` it was built from.
+	"""
+	people = len(index.distances[0]) if index.distances else 0
+	path = index_path(directory)
+	temporary = f"{path}.{os.getpid()}.tmp"
+	try:
+		with open(temporary, "wb") as f:
+			f.write(HEADER.pack(MAGIC, *stats, len(index.landmarks), people))
+			f.write(array("i", index.landmarks))
+			for row in index.distances:
+				f.write(row)
+		os.replace(temporary, path)
+	finally:
+		if os.path.exists(temporary):
+			os.remove(temporary)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,299 @@
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import compress
+
+from graph import INDEX_TYPE
+
+# Ways to pick one person among several with the same name
+POLICIES = ("most-films", "oldest", "youngest")
+
+# Fuzzy matches further than this many edits away are dropped
+MAX_EDITS = 2
+
+# Probing a sorted posting list for one spelling costs about as much
+# as scanning this many of its entries
+PROBE_COST = 16
+
+# A trailing "(1958)" on a name is read as a birth year hint
+BIRTH_HINT = re.compile(r"^(.*?)\s*\((\d{4})\)\s*$")
+
+
+class NameIndex():
+	"""
+	Name lookup for the people in a Graph.
+
+	Keeps the people sorted by lowercase name for prefix completion,
+	and the Postings from character trigrams to the distinct lowercase
+	names containing them for typo-tolerant lookup.
+	"""
+
+	def __init__(self, graph):
+		self.graph = graph
+
+		# Reuse the sort order a snapshot already stores, if there is one
+		order = getattr(graph.names, "order", None)
+		if order is None:
+			order = array(INDEX_TYPE, sorted(range(graph.num_people), key=self.key))
+		self.order = order
+
+		# Likewise the trigram postings, which are slow to build
+		if graph.name_postings is None:
+			graph.name_postings = build_postings(graph.person_names)
+		self.postings = graph.name_postings
+		self.grams = {gram: g for g, gram in enumerate(self.postings.grams)}
+
+	def key(self, person):
+		return self.graph.person_names[person].lower()
+
+	def exact(self, name):
+		"""
+		Returns the people named `name`, ignoring case.
+		"""
+		return self.graph.people_named(name)
+
+	def prefix(self, prefix, limit=10):
+		"""
+		Returns up to `limit` people whose name starts with `prefix`,
+		ignoring case, in alphabetical order.
+		"""
+		prefix = prefix.lower()
+		start = bisect_left(self.order, prefix, key=self.key)
+		matches = []
+		for i in range(start, min(start + limit, len(self.order))):
+			person = self.order[i]
+			if not self.key(person).startswith(prefix):
+				break
+			matches.append(person)
+		return matches
+
+	def fuzzy(self, name, limit=5, max_edits=MAX_EDITS):
+		"""
+		Returns up to `limit` people whose name is within `max_edits`
+		insertions, deletions or substitutions of `name`, closest first,
+		then by number of films.
+		"""
+		name = name.lower()
+		postings = self.postings
+		entries = postings.gram_postings
+
+		# Spellings are numbered by length, so those within `max_edits`
+		# characters of `name` are numbered `low` up to `high`, and only
+		# that slice of each posting list can hold a match
+		starts = postings.length_starts
+		low = starts[min(max(0, len(name) - max_edits), len(starts) - 1)]
+		high = starts[min(len(name) + max_edits + 1, len(starts) - 1)]
+		grams = set(trigrams(name))
+		lists = []
+		for gram in grams:
+			g = self.grams.get(gram)
+			if g is None:
+				lists.append(())
+				continue
+			start = bisect_left(entries, low, postings.gram_offsets[g], postings.gram_offsets[g + 1])
+			end = bisect_left(entries, high, start, postings.gram_offsets[g + 1])
+			lists.append(entries[start:end])
+
+		# One edit changes at most three trigrams, so a close enough name
+		# must share all but 3 * max_edits of them. It then turns up in one
+		# of the shortest len(grams) - needed + 1 lists, which seed the
+		# candidates. Each longer list is scanned or probed, whichever is
+		# cheaper, and drops the candidates that can no longer get there.
+		needed = len(grams) - 3 * max_edits
+		if needed <= 0:
+			candidates = range(low, high)
+		else:
+			lists.sort(key=len)
+			cut = len(lists) - needed + 1
+			counts = Counter()
+			for spellings in lists[:cut]:
+				counts.update(spellings)
+			candidates = set(counts)
+			for i in range(cut, len(lists)):
+				spellings = lists[i]
+				if len(spellings) < PROBE_COST * len(candidates):
+					counts.update(candidates.intersection(spellings))
+				else:
+					counts.update(s for s in candidates if contains(spellings, s))
+				least = needed - (len(lists) - i - 1)
+				candidates = set(compress(candidates, map(least.__le__, map(counts.__getitem__, candidates))))
+		scored = []
+		for s in candidates:
+			people = postings.spelling_people[postings.spelling_offsets[s]:postings.spelling_offsets[s + 1]]
+			distance = edit_distance(name, self.key(people[0]), max_edits)
+			if distance <= max_edits:
+				for person in people:
+					scored.append((distance, -self.films(person), person))
+		scored.sort()
+		return [person for _, _, person in scored[:limit]]
+
+	def films(self, person):
+		return len(self.graph.movies_of(person))
+
+	def choose(self, people, policy="most-films", birth=None):
+		"""
+		Picks one of `people` without prompting. A `birth` year hint
+		narrows the choice to people born that year if any are, and
+		`policy` (one of POLICIES) settles the rest. Returns None if
+		`people` is empty.
+		"""
+		if birth is not None:
+			born = [person for person in people if self.graph.person_births[person] == str(birth)]
+			people = born or people
+		if not people:
+			return None
+		if policy == "most-films":
+			return max(people, key=self.films)
+		births = [person for person in people if self.graph.person_births[person]]
+		if policy == "oldest" and births:
+			return min(births, key=lambda person: int(self.graph.person_births[person]))
+		if policy == "youngest" and births:
+			return max(births, key=lambda person: int(self.graph.person_births[person]))
+		if policy not in POLICIES:
+			raise ValueError(f"Unknown disambiguation policy '{policy}'")
+		return people[0]
+
+	def resolve(self, name, policy="most-films", fuzzy=True):
+		"""
+		Returns the person best matching `name` without prompting, or
+		None. A trailing "(1958)" is read as a birth year hint. Exact
+		matches win; otherwise the closest fuzzy matches are considered.
+		Those are looked for one edit away before two, which is much
+		cheaper and settles most typos.
+		"""
+		name, birth = split_birth_hint(name)
+		people = self.exact(name)
+		if not people and fuzzy:
+			for edits in range(1, MAX_EDITS + 1):
+				matches = self.fuzzy(name, max_edits=edits)
+				if matches:
+					closest = edit_distance(name.lower(), self.key(matches[0]), edits)
+					people = [
+						person for person in matches
+						if edit_distance(name.lower(), self.key(person), edits) == closest
+					]
+					break
+		return self.choose(people, policy, birth)
+
+
+class Postings():
+	"""
+	Trigram index over the distinct lowercase names ("spellings") of a
+	Graph's people, in flat arrays that a snapshot can store.
+
+	Spellings are numbered by length, then alphabetically. Spelling `s`
+	is the name of the people
+	`spelling_people[spelling_offsets[s]:spelling_offsets[s + 1]]`, and
+	the spellings of length `n` are numbered `length_starts[n]` up to
+	`length_starts[n + 1]`. Trigram `grams[g]` occurs in the spellings
+	`gram_postings[gram_offsets[g]:gram_offsets[g + 1]]`, in increasing
+	order, and `grams` is sorted.
+	"""
+
+	def __init__(self, grams, spelling_offsets, spelling_people, length_starts, gram_offsets, gram_postings):
+		self.grams = grams
+		self.spelling_offsets = spelling_offsets
+		self.spelling_people = spelling_people
+		self.length_starts = length_starts
+		self.gram_offsets = gram_offsets
+		self.gram_postings = gram_postings
+
+
+def build_postings(person_names):
+	"""
+	Returns the Postings for the people named `person_names`.
+	"""
+	people = {}
+	for person, name in enumerate(person_names):
+		people.setdefault(name.lower(), []).append(person)
+	spellings = sorted(people, key=lambda spelling: (len(spelling), spelling))
+
+	spelling_offsets = array(INDEX_TYPE, [0])
+	spelling_people = array(INDEX_TYPE)
+	length_starts = array(INDEX_TYPE)
+	lists = {}
+	for s, spelling in enumerate(spellings):
+		while len(length_starts) <= len(spelling):
+			length_starts.append(s)
+		spelling_people.extend(people[spelling])
+		spelling_offsets.append(len(spelling_people))
+		for gram in set(trigrams(spelling)):
+			lists.setdefault(gram, array(INDEX_TYPE)).append(s)
+	length_starts.append(len(spellings))
+
+	grams = sorted(lists)
+	gram_offsets = array(INDEX_TYPE, [0])
+	gram_postings = array(INDEX_TYPE)
+	for gram in grams:
+		gram_postings.extend(lists[gram])
+		gram_offsets.append(len(gram_postings))
+	return Postings(grams, spelling_offsets, spelling_people, length_starts, gram_offsets, gram_postings)
+
+
+def split_birth_hint(name):
+	"""
+	Splits "Name (1958)" into ("Name", 1958); other names get None.
+	"""
+	match = BIRTH_HINT.match(name)
+	if match is None:
+		return name, None
+	return match.group(1), int(match.group(2))
+
+
+def trigrams(text):
+	"""
+	Returns the character trigrams of `text`, padded so that
+	the first and last characters get trigrams of their own.
+	"""
+	padded = f"  {text} "
+	return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def contains(items, item):
+	"""
+	Returns whether sorted `items` contains `item`.
+	"""
+	i = bisect_left(items, item)
+	return i < len(items) and items[i] == item
+
+
+def edit_distance(a, b, limit):
+	"""
+	Returns the Levenshtein distance between `a` and `b`, or
+	`limit + 1` if it exceeds `limit`.
+
+	Uses Myers' bit-parallel algorithm: bit `i` of `positive` and
+	`negative` says whether row `i + 1` of the current column of the
+	distance table is one more or one less than row `i`, so a whole
+	column is updated with a few integer operations.
+	"""
+	far = limit + 1
+	if abs(len(a) - len(b)) > limit:
+		return far
+	if not a:
+		return min(len(b), far)
+	masks = {}
+	for i, x in enumerate(a):
+		masks[x] = masks.get(x, 0) | 1 << i
+	full = (1 << len(a)) - 1
+	last = 1 << (len(a) - 1)
+	positive, negative = full, 0
+	distance = len(a)
+	for j, y in enumerate(b):
+		match = masks.get(y, 0)
+		vertical = match | negative
+		horizontal = (((match & positive) + positive) ^ positive) | match
+		up = negative | ~(horizontal | positive)
+		down = positive & horizontal
+		if up & last:
+			distance += 1
+		elif down & last:
+			distance -= 1
+		# Each remaining column lowers the distance by at most one
+		if distance - (len(b) - j - 1) > limit:
+			return far
+		up = (up << 1) | 1
+		positive = ((down << 1) | ~(vertical | up)) & full
+		negative = up & vertical
+	return min(distance, far)
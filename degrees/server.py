@@ -0,0 +1,79 @@
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+from batch import WORKERS, answer, fork_pool
+
+HOST = "127.0.0.1"
+PORT = 8050
+
+
+def main():
+	if len(sys.argv) not in (2, 3):
+		sys.exit("Usage: python server.py directory [port]")
+	directory = sys.argv[1]
+	port = int(sys.argv[2]) if len(sys.argv) == 3 else PORT
+
+	print("Loading data...")
+	degrees.load_data(directory)
+	print("Data loaded.")
+
+	# Build the name index before forking, so every worker shares it
+	degrees.name_index()
+
+	server = QueryServer((HOST, port), WORKERS)
+	print(f"Serving on http://{HOST}:{port}/path?source=...&target=...")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+
+class QueryServer(ThreadingHTTPServer):
+	"""
+	HTTP server that keeps the graph resident and answers path queries
+	on a pool of worker processes forked after the graph was loaded.
+	"""
+	daemon_threads = True
+
+	def __init__(self, address, workers):
+		super().__init__(address, QueryHandler)
+		self.pool = fork_pool(workers)
+
+	def query(self, source, target):
+		return self.pool.apply(answer, (source, target))
+
+	def server_close(self):
+		super().server_close()
+		self.pool.terminate()
+		self.pool.join()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		params = parse_qs(url.query)
+		if url.path != "/path":
+			self.send_json(404, {"error": "Not found."})
+		elif "source" not in params or "target" not in params:
+			self.send_json(400, {"error": "Expected source and target parameters."})
+		else:
+			result = self.server.query(params["source"][0], params["target"][0])
+			self.send_json(400 if "error" in result else 200, result)
+
+	def send_json(self, status, body):
+		data = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,254 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from graph import INDEX_TYPE, Graph, load_graph
+from nameindex import Postings, build_postings
+
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+MAGIC = b"DEGREES\x02"
+
+# Magic, then (mtime_ns, size) of each source CSV, then the section count
+HEADER = struct.Struct("<8s6qq")
+
+# Byte offset and length of one section
+SECTION = struct.Struct("<qq")
+
+# Typecode for string table offsets (64-bit, blobs can outgrow 2 GiB)
+STRING_OFFSET_TYPE = "q"
+
+ARRAYS = (
+	"person_offsets", "person_movies", "movie_offsets", "movie_stars",
+	"person_order", "movie_order", "name_order"
+)
+STRINGS = (
+	"person_ids", "person_names", "person_births",
+	"movie_ids", "movie_titles", "movie_years"
+)
+
+# Arrays of the name Postings, stored after the strings and followed
+# by the string table of its trigrams
+POSTINGS = (
+	"spelling_offsets", "spelling_people", "length_starts",
+	"gram_offsets", "gram_postings"
+)
+SECTIONS = len(ARRAYS) + 2 * len(STRINGS) + len(POSTINGS) + 2
+
+
+def main():
+	if len(sys.argv) != 2:
+		sys.exit("Usage: python snapshot.py directory")
+	directory = sys.argv[1]
+	stats = source_stats(directory)
+	write_snapshot(directory, load_graph(directory), stats)
+	print(f"Wrote {snapshot_path(directory)}")
+
+
+class StringTable():
+	"""
+	Read-only sequence of strings stored as one UTF-8 blob,
+	where string `i` is `blob[offsets[i]:offsets[i + 1]]`.
+	"""
+
+	def __init__(self, offsets, blob):
+		self.offsets = offsets
+		self.blob = blob
+
+	def __len__(self):
+		return len(self.offsets) - 1
+
+	def __getitem__(self, i):
+		if not 0 <= i < len(self):
+			raise IndexError("string table index out of range")
+		return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class SortedIndex():
+	"""
+	Read-only mapping from `key(i)` to `i`, by binary search
+	over `order`, which lists every `i` sorted by `key(i)`.
+	"""
+
+	def __init__(self, order, key):
+		self.order = order
+		self.key = key
+
+	def __contains__(self, k):
+		return bool(self.all(k))
+
+	def __getitem__(self, k):
+		matches = self.all(k)
+		if not matches:
+			raise KeyError(k)
+		return matches[0]
+
+	def get(self, k, default=None):
+		return self.all(k) or default
+
+	def all(self, k):
+		"""
+		Returns every `i` with `key(i) == k`.
+		"""
+		start = bisect_left(self.order, k, key=self.key)
+		end = bisect_right(self.order, k, lo=start, key=self.key)
+		return list(self.order[start:end])
+
+
+def snapshot_path(directory):
+	return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def source_stats(directory):
+	"""
+	Returns the (mtime_ns, size) of every source CSV in `directory`.
+	"""
+	stats = []
+	for name in SOURCES:
+		st = os.stat(os.path.join(directory, name))
+		stats.extend((st.st_mtime_ns, st.st_size))
+	return tuple(stats)
+
+
+def open_graph(directory):
+	"""
+	Returns the Graph for `directory`, memory-mapped from its snapshot
+	if that is still fresh. Otherwise parses the CSVs and tries to
+	rewrite the snapshot for next time.
+	"""
+	graph = load_snapshot(directory)
+	if graph is None:
+		stats = source_stats(directory)
+		graph = load_graph(directory)
+		try:
+			write_snapshot(directory, graph, stats)
+		except OSError:
+			pass
+	return graph
+
+
+def load_snapshot(directory):
+	"""
+	Memory-maps the snapshot in `directory` and returns its Graph.
+
+	Returns None if there is no snapshot, or it was written
+	for CSVs whose mtime or size has since changed.
+	"""
+	try:
+		stats = source_stats(directory)
+		with open(snapshot_path(directory), "rb") as f:
+			buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	except (OSError, ValueError):
+		return None
+
+	view = memoryview(buffer)
+	header = HEADER.unpack_from(view) if len(view) >= HEADER.size else None
+	if header is None or header[0] != MAGIC or header[1:-1] != stats or header[-1] != SECTIONS:
+		view.release()
+		buffer.close()
+		return None
+
+	sections = []
+	for i in range(header[-1]):
+		offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+		sections.append(view[offset:offset + length])
+
+	arrays = {}
+	for name, section in zip(ARRAYS, sections):
+		arrays[name] = section.cast(INDEX_TYPE)
+	strings = {}
+	for i, name in enumerate(STRINGS):
+		offsets = sections[len(ARRAYS) + 2 * i].cast(STRING_OFFSET_TYPE)
+		strings[name] = StringTable(offsets, sections[len(ARRAYS) + 2 * i + 1])
+	first = len(ARRAYS) + 2 * len(STRINGS)
+	for name, section in zip(POSTINGS, sections[first:]):
+		arrays[name] = section.cast(INDEX_TYPE)
+	grams = StringTable(sections[-2].cast(STRING_OFFSET_TYPE), sections[-1])
+
+	person_ids = strings["person_ids"]
+	movie_ids = strings["movie_ids"]
+	person_names = strings["person_names"]
+	return Graph(
+		person_ids, person_names, strings["person_births"],
+		movie_ids, strings["movie_titles"], strings["movie_years"],
+		arrays["person_offsets"], arrays["person_movies"],
+		arrays["movie_offsets"], arrays["movie_stars"],
+		SortedIndex(arrays["person_order"], person_ids.__getitem__),
+		SortedIndex(arrays["movie_order"], movie_ids.__getitem__),
+		SortedIndex(arrays["name_order"], lambda person: person_names[person].lower()),
+		Postings(grams, *(arrays[name] for name in POSTINGS))
+	)
+
+
+def write_snapshot(directory, graph, stats):
+	"""
+	Writes `graph` as the snapshot for `directory`, recording the
+	source CSV `stats` it was built from.
+	"""
+	person_ids = graph.person_ids
+	movie_ids = graph.movie_ids
+	person_names = graph.person_names
+
+	def order(count, key):
+		return array(INDEX_TYPE, sorted(range(count), key=key))
+
+	sections = [
+		graph.person_offsets, graph.person_movies,
+		graph.movie_offsets, graph.movie_stars,
+		order(len(person_ids), person_ids.__getitem__),
+		order(len(movie_ids), movie_ids.__getitem__),
+		order(len(person_ids), lambda person: person_names[person].lower())
+	]
+	for name in STRINGS:
+		sections.extend(pack_strings(getattr(graph, name)))
+
+	# Keep the postings on `graph` too, so this process need not build them again
+	if graph.name_postings is None:
+		graph.name_postings = build_postings(person_names)
+	postings = graph.name_postings
+	sections.extend(getattr(postings, name) for name in POSTINGS)
+	sections.extend(pack_strings(postings.grams))
+
+	# Lay every section out on an 8-byte boundary after the section table
+	layout = []
+	position = HEADER.size + len(sections) * SECTION.size
+	for section in sections:
+		position += -position % 8
+		length = memoryview(section).nbytes
+		layout.append((position, length))
+		position += length
+
+	path = snapshot_path(directory)
+	temporary = f"{path}.{os.getpid()}.tmp"
+	try:
+		with open(temporary, "wb") as f:
+			f.write(HEADER.pack(MAGIC, *stats, len(sections)))
+			for offset, length in layout:
+				f.write(SECTION.pack(offset, length))
+			for (offset, length), section in zip(layout, sections):
+				f.write(bytes(offset - f.tell()))
+				f.write(section)
+		os.replace(temporary, path)
+	finally:
+		if os.path.exists(temporary):
+			os.remove(temporary)
+
+
+def pack_strings(strings):
+	"""
+	Returns (offsets, blob) for a StringTable holding `strings`.
+	"""
+	offsets = array(STRING_OFFSET_TYPE, [0])
+	blob = bytearray()
+	for string in strings:
+		blob += string.encode("utf-8")
+		offsets.append(len(blob))
+	return offsets, blob
+
+
+if __name__ == "__main__":
+	main()
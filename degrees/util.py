@@ -1,8 +1,14 @@
+import time
+from collections import deque
+from contextlib import nullcontext
+
+
 class Node():
     def __init__(self,person_id,movie_id,parent):
         self.person_id = person_id
         self.parent = parent
         self.movie_id = movie_id
+        self.depth = 0 if parent is None else parent.depth + 1
 
 
 class StackFrontier():
@@ -13,7 +19,7 @@ class StackFrontier():
         self.frontier.append(node)
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return any(node.person_id == state for node in self.frontier)
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,17 +28,105 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self.frontier.pop()
 
 
 class QueueFrontier(StackFrontier):
 
+    def __init__(self):
+        self.frontier = deque()
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self.frontier.popleft()
+
+
+class SearchStats():
+    """
+    Counters and timings collected while answering one query.
+
+    `frontier[d]` is the number of people queued at depth `d` from the
+    source (`backward_frontier` holds the same for the target side of a
+    bidirectional search), and `phases` maps phase names such as
+    "load", "lookup", "search" and "path" to seconds spent in them.
+    """
+
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.neighbors_generated = 0
+        self.frontier = []
+        self.backward_frontier = []
+        self.phases = {}
+        self.running = []
+
+    def queued(self, depth, backward=False):
+        sizes = self.backward_frontier if backward else self.frontier
+        while len(sizes) <= depth:
+            sizes.append(0)
+        sizes[depth] += 1
+
+    def phase(self, name):
+        """
+        Returns a context manager adding the time spent inside it
+        to phase `name`. Phases nest: time spent in an inner phase
+        is not counted towards the outer one as well.
+        """
+        return Phase(self, name)
+
+    def as_dict(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "neighbors_generated": self.neighbors_generated,
+            "frontier": list(self.frontier),
+            "backward_frontier": list(self.backward_frontier),
+            "phases": dict(self.phases)
+        }
+
+    def report(self):
+        lines = [
+            f"Nodes expanded: {self.nodes_expanded}",
+            f"Neighbors generated: {self.neighbors_generated}",
+            f"Frontier per depth: {self.frontier}"
+        ]
+        if self.backward_frontier:
+            lines.append(f"Target-side frontier per depth: {self.backward_frontier}")
+        for name, seconds in self.phases.items():
+            lines.append(f"{name.capitalize()}: {seconds * 1000:.2f} ms")
+        return "\n".join(lines)
+
+
+class Phase():
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        now = time.perf_counter()
+        running = self.stats.running
+        if running:
+            running[-1].pause(now)
+        running.append(self)
+        self.started = now
+        return self
+
+    def __exit__(self, *exc):
+        now = time.perf_counter()
+        self.pause(now)
+        running = self.stats.running
+        running.pop()
+        if running:
+            running[-1].started = now
+
+    def pause(self, now):
+        phases = self.stats.phases
+        phases[self.name] = phases.get(self.name, 0.0) + now - self.started
+
+
+def phase(stats, name):
+    """
+    Returns `stats.phase(name)`, or a context manager that does
+    nothing if `stats` is None.
+    """
+    return nullcontext() if stats is None else stats.phase(name)
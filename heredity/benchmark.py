@@ -0,0 +1,137 @@
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+import heredity
+
+FAMILIES = ("data/family0.csv", "data/family1.csv", "data/family2.csv")
+
+# Sizes of the synthetic pedigrees; enumeration only runs up to ENUMERATE_LIMIT people
+PEDIGREE_SIZES = (6, 8, 100, 200, 1000)
+ENUMERATE_LIMIT = 8
+
+# Chance that a child marries someone from outside the family
+MARRIAGE_RATE = 0.6
+
+# Chance that a person's trait is known
+KNOWN_TRAIT_RATE = 0.5
+
+# Samples drawn when timing sample_probabilities
+SAMPLES = 10000
+
+SEED = 50
+
+REPEAT = 3
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [scale]")
+    scale = float(sys.argv[1]) if len(sys.argv) == 2 else 1.0
+
+    for filename in FAMILIES:
+        run(filename, heredity.load_data(filename))
+
+    for size in PEDIGREE_SIZES:
+        size = size if size <= ENUMERATE_LIMIT else max(ENUMERATE_LIMIT + 1, int(size * scale))
+        run(f"pedigree ({size} people)", generate(size))
+
+
+def run(label, people):
+    """
+    Compute the probabilities of `people` `REPEAT` times with each
+    engine that can handle that many people, and print the time taken.
+
+    Then estimate them once with each sampling method, and print the
+    time taken, the largest error in any gene probability and the
+    sampling diagnostics.
+
+    Every engine's result is checked to be finite and normalized, and
+    the joint probability of a random assignment of genes is printed
+    next to its logarithm, to show where it underflows.
+    """
+    known = sum(people[person]["trait"] is not None for person in people)
+    print(f"{label}: {len(people)} people, {known} known traits")
+
+    order, mothers, fathers, _ = heredity.pedigree(people)
+    assignment = heredity.forward_sample(order, mothers, fathers, 1, np.random.default_rng(SEED))[0]
+    one_gene = {person for person, genes in zip(people, assignment) if genes == 1}
+    two_genes = {person for person, genes in zip(people, assignment) if genes == 2}
+    have_trait = {person for person in people if people[person]["trait"]}
+    p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+    log_p = heredity.log_joint_probability(people, one_gene, two_genes, have_trait)
+    print(f"  joint probability of a random assignment: {p:.3g}, logarithm {log_p:.1f}")
+
+    engines = {"infer": heredity.infer}
+    if len(people) <= ENUMERATE_LIMIT:
+        engines["enumerate"] = heredity.enumerate_probabilities
+
+    for name, engine in engines.items():
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            probabilities = engine(people)
+        elapsed = (time.perf_counter() - start) / REPEAT
+        check(name, probabilities)
+        print(f"  {name}: {elapsed * 1000:.2f} ms")
+
+    # Sampling is timed once, and compared with exact inference
+    exact = heredity.infer(people)
+    for method in heredity.SAMPLERS:
+        diagnostics = dict()
+        start = time.perf_counter()
+        estimate = heredity.sample_probabilities(people, method, SAMPLES, seed=SEED, diagnostics=diagnostics)
+        elapsed = time.perf_counter() - start
+        check(method, estimate)
+        error = max(
+            abs(estimate[person]["gene"][genes] - exact[person]["gene"][genes])
+            for person in people for genes in heredity.GENES
+        )
+        details = ", ".join(f"{key} {value:.3g}" for key, value in diagnostics.items())
+        print(f"  {method}: {elapsed * 1000:.2f} ms, error {error:.3f}, {details}")
+
+
+def check(name, probabilities):
+    """
+    Assert that every distribution in `probabilities` is finite and
+    sums to 1.
+    """
+    for person in probabilities:
+        for field, distribution in probabilities[person].items():
+            values = list(distribution.values())
+            assert all(math.isfinite(value) for value in values) and math.isclose(sum(values), 1), \
+                f"{name}: {field} distribution of {person} is not normalized: {distribution}"
+
+
+def generate(size, seed=SEED):
+    """
+    Return a synthetic pedigree of `size` people, in the format of
+    `heredity.load_data`.
+
+    It starts from one couple. Each new person is a child of a random
+    couple, and may marry someone new from outside the family, who has
+    no parents listed. Nobody marries a relative.
+    """
+    rng = random.Random(seed)
+    people = dict()
+
+    def add(mother=None, father=None):
+        name = f"Person {len(people) + 1}"
+        trait = rng.random() < 0.5 if rng.random() < KNOWN_TRAIT_RATE else None
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        return name
+
+    couples = [(add(), add())]
+    while len(people) < size:
+        mother, father = rng.choice(couples)
+        child = add(mother, father)
+        if len(people) < size and rng.random() < MARRIAGE_RATE:
+            spouse = add()
+            couples.append((child, spouse) if rng.random() < 0.5 else (spouse, child))
+    return people
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import itertools
+import math
+import sys
+
+import numpy as np
+
+import heredity
+from benchmark import FAMILIES, SEED, check, generate
+
+# Pedigrees this large have joint probabilities far below 1e-100
+LARGE_PEDIGREE = 200
+
+# Children of a single couple; each child's message to the couple has
+# entries of about 1/9, so their product is far too small for floats
+LARGE_SIBSHIP = 400
+
+
+def main():
+    if len(sys.argv) != 1:
+        sys.exit("Usage: python check.py")
+
+    # Enumeration adds up its joint probabilities as logarithms
+    for filename in FAMILIES:
+        people = heredity.load_data(filename)
+        enumerated = heredity.enumerate_probabilities(people)
+        check("enumerate", enumerated)
+        assert_close(filename, enumerated, heredity.infer(people))
+
+    # Logarithms whose exponentials round to 0 still normalize
+    log_probabilities = {"Person": {"gene": {2: -1200.0, 1: -1200.0 + math.log(3), 0: -math.inf}}}
+    heredity.log_normalize(log_probabilities)
+    assert_close("log_normalize", log_probabilities, {"Person": {"gene": {2: 0.25, 1: 0.75, 0: 0}}})
+
+    # Without known traits, a couple's genes follow PROBS whatever their number of children
+    people = sibship(LARGE_SIBSHIP)
+    probabilities = heredity.infer(people)
+    check("infer", probabilities)
+    for parent in ("Mother", "Father"):
+        assert_close("sibship", {parent: probabilities[parent]}, {parent: {"gene": heredity.PROBS["gene"]}})
+
+    # With known traits, the couple's genes are also worked out directly
+    for traits in ((True,), (False,), (True, False, None)):
+        people = sibship(LARGE_SIBSHIP, traits)
+        probabilities = heredity.infer(people)
+        check("infer", probabilities)
+        assert_close(f"sibship with traits {traits}", probabilities, couple_probabilities(people))
+
+    # Larger families are only within reach of infer and the samplers
+    people = generate(LARGE_PEDIGREE)
+    check("infer", heredity.infer(people))
+    for method in heredity.SAMPLERS:
+        check(method, heredity.sample_probabilities(people, method, seed=SEED))
+
+    order, mothers, fathers, _ = heredity.pedigree(people)
+    assignment = heredity.forward_sample(order, mothers, fathers, 1, np.random.default_rng(SEED))[0]
+    one_gene = {person for person, genes in zip(people, assignment) if genes == 1}
+    two_genes = {person for person, genes in zip(people, assignment) if genes == 2}
+    have_trait = {person for person in people if people[person]["trait"]}
+    log_p = heredity.log_joint_probability(people, one_gene, two_genes, have_trait)
+    p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+    assert math.isfinite(log_p) and math.isclose(math.exp(log_p), p), (log_p, p)
+
+    print("All checks passed.")
+
+
+def sibship(children, traits=(None,)):
+    """
+    Return a pedigree of a couple and their `children`, in the format
+    of `heredity.load_data`. Everyone's trait is taken from `traits`
+    in turn.
+    """
+    traits = itertools.cycle(traits)
+    people = {
+        parent: {"name": parent, "mother": None, "father": None, "trait": next(traits)}
+        for parent in ("Mother", "Father")
+    }
+    for i in range(children):
+        child = f"Child {i + 1}"
+        people[child] = {"name": child, "mother": "Mother", "father": "Father", "trait": next(traits)}
+    return people
+
+
+def couple_probabilities(people):
+    """
+    Return the gene distributions of the couple of a `sibship`, summing
+    over their nine pairs of gene counts in log space. Given the couple's
+    genes, each child's genes and trait are independent of the others'.
+    """
+    gene, trait, inherited = heredity.probability_tables()
+    evidence = {
+        person: trait[:, int(people[person]["trait"])] if people[person]["trait"] is not None else np.ones(3)
+        for person in people
+    }
+    log_p = np.log(np.outer(gene * evidence["Mother"], gene * evidence["Father"]))
+    for person in people:
+        if people[person]["mother"] is not None:
+            log_p += np.log(inherited @ evidence[person])
+    p = np.exp(log_p - log_p.max())
+    p /= p.sum()
+    return {
+        "Mother": {"gene": dict(enumerate(p.sum(axis=1).tolist()))},
+        "Father": {"gene": dict(enumerate(p.sum(axis=0).tolist()))}
+    }
+
+
+def assert_close(label, probabilities, expected):
+    """
+    Assert that every probability in `probabilities` is within 1e-9
+    of the same one in `expected`.
+    """
+    for person in expected:
+        for field, distribution in expected[person].items():
+            for value, p in distribution.items():
+                q = probabilities[person][field][value]
+                assert math.isclose(q, p, abs_tol=1e-9), f"{label}: {person} {field} {value}: {q} != {p}"
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import csv
+import functools
+import heapq
 import itertools
+import math
+import multiprocessing
+import operator
+import os
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,16 +44,56 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible numbers of copies of the gene
+GENES = (2, 1, 0)
+
+# Assignments of genes evaluated at a time by enumerate_probabilities
+ENUMERATE_BATCH = 100000
+
+# Samples drawn by sample_probabilities, split between CHAINS chains
+SAMPLES = 10000
+CHAINS = 4
+
+# Chains are run by WORKERS processes once they draw this many genes in total
+PARALLEL_DRAWS = 1000000
+WORKERS = os.cpu_count() or 1
+
+# Assignments drawn at a time by likelihood weighting
+SAMPLE_BATCH = 10000
+
+# Gibbs sampling chains updated in step, and their unrecorded first sweeps
+WALKERS = 100
+BURN_IN = 50
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) < 2 or sys.argv[2:] not in ([], ["--gibbs"], ["--weighting"]):
+        sys.exit("Usage: python heredity.py data.csv [--gibbs | --weighting]")
     people = load_data(sys.argv[1])
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    # Compute gene and trait probabilities for each person
+    if len(sys.argv) == 3:
+        probabilities = sample_probabilities(people, sys.argv[2][2:])
+    else:
+        probabilities = infer(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def empty_probabilities(people):
+    """
+    Return a gene and trait distribution of all zeros for each person.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,38 +108,84 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+def empty_log_probabilities(people):
+    """
+    Return a gene and trait distribution of all zeros for each person,
+    as logarithms.
+    """
+    return {
+        person: {
+            "gene": {
+                2: -math.inf,
+                1: -math.inf,
+                0: -math.inf
+            },
+            "trait": {
+                True: -math.inf,
+                False: -math.inf
+            }
+        }
+        for person in people
+    }
+
+
+def enumerate_probabilities(people):
+    """
+    Compute gene and trait probabilities for each person by summing
+    `joint_probability` over every assignment of genes and traits that
+    agrees with the known traits. Takes O(3^n 2^u) time for n people,
+    u of them with an unknown trait.
+
+    For each choice of unknown traits, the 3^n assignments of genes
+    are evaluated in batches of ENUMERATE_BATCH (see `gene_batches`).
+    The probabilities are added up as logarithms, since in larger
+    families they are too small for floats.
+    """
+    # Keep track of the logarithms of gene and trait probabilities for each person
+    log_probabilities = empty_log_probabilities(people)
+
+    # People with a known trait keep it, so only the others vary
+    names = list(people)
+    unknown = {person for person in names if people[person]["trait"] is None}
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Loop over all sets of people who might have the trait
+    for maybe_trait in subsets(unknown):
+        have_trait = [person in maybe_trait or people[person]["trait"] is True for person in names]
+        for genes in gene_batches(len(names)):
+            log_p = log_joint_probabilities(people, genes, np.broadcast_to(have_trait, genes.shape))
+
+            # Add up the joint probabilities relative to the largest one
+            top = log_p.max()
+            if top == -math.inf:
+                continue
+            p = np.exp(log_p - top)
+            total = math.log(p.sum()) + top
+            for i, person in enumerate(names):
+                with np.errstate(divide="ignore"):
+                    sums = np.log(np.bincount(genes[:, i], weights=p, minlength=3)) + top
+                for value, log_q in enumerate(sums.tolist()):
+                    gene = log_probabilities[person]["gene"]
+                    gene[value] = log_add(gene[value], log_q)
+                trait = log_probabilities[person]["trait"]
+                trait[have_trait[i]] = log_add(trait[have_trait[i]], total)
 
     # Ensure probabilities sum to 1
-    normalize(probabilities)
+    log_normalize(log_probabilities)
+    return log_probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def gene_batches(n):
+    """
+    Yield every assignment of gene counts to `n` people, as arrays of
+    at most ENUMERATE_BATCH rows with one column per person.
+    """
+    assignments = itertools.product(GENES, repeat=n)
+    while True:
+        rows = list(itertools.islice(assignments, ENUMERATE_BATCH))
+        if not rows:
+            return
+        yield np.array(rows, dtype=np.intp).reshape(len(rows), n)
 
 
 def load_data(filename):
@@ -128,6 +222,16 @@ def powerset(s):
     ]
 
 
+def subsets(s):
+    """
+    Yield every subset of set s, one at a time.
+    """
+    s = list(s)
+    for r in range(len(s) + 1):
+        for subset in itertools.combinations(s, r):
+            yield set(subset)
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -139,140 +243,99 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    prob_arr=list()
-
-    for person in one_gene:
-    	pb=0
-
-    	if people[person]['mother'] is not None and people[person]['father'] is not None:
-    		m=people[person]['mother']
-    		f=people[person]['father']
-
-    		if m in one_gene and f in one_gene:
-    			pb=(0.5)*(0.5)*2     # case is symmetrical for father and mother (m gives the one gene or f gives the one gene)
-
-    		elif (m in one_gene and f in two_genes) or (f in one_gene and m in two_genes):
-    			pb=(0.5*0.99)*(0.01) + (0.5*0.99)*(0.99)
-
-    		elif m in two_genes and f in two_genes:
-    			pb=(0.99*0.01)*2
-
-    		elif (m not in one_gene and m not in two_genes and f in one_gene) or (f not in one_gene and f not in two_genes and m in one_gene):
-    			pb=(0.01*0.5)+(0.99*0.5)    			
-    		
-    		elif (m not in one_gene and m not in two_genes and f in two_genes) or (f not in one_gene and f not in two_genes and m in two_genes):
-    			pb=(0.01*0.01)+(0.99*0.99)
-
-    		elif (m not in one_gene and m not in two_genes and f not in one_gene and f not in two_genes):
-    			pb=(0.01*0.99)*2
-
-    		if person in have_trait	:
-    			pb*=PROBS['trait'][1][True]
-    		if person not in have_trait:
-    			pb*=PROBS['trait'][1][False]
-    			
-    		prob_arr.append(pb)	
-
-    	else:
-    		if person in have_trait:
-    			prob_arr.append(PROBS['gene'][1]*PROBS['trait'][1][True])
-
-    		else:
-    			prob_arr.append(PROBS['gene'][1]*PROBS['trait'][1][False])
-    			
-    
-    
-    for person in two_genes:
-    	pb=0
-
-    	if people[person]['mother'] is not None and people[person]['father'] is not None:
-    		m=people[person]['mother']
-    		f=people[person]['father']
-
-    		if m in one_gene and f in one_gene:
-    			pb=0.5*0.5
-
-    		elif (m in one_gene and f in two_genes) or (f in one_gene and m in two_genes):
-    			pb=0.5*0.99
-
-    		elif m in two_genes and f in two_genes:
-    			pb=0.99*0.99
-
-    		elif (m not in one_gene and m not in two_genes and f in one_gene) or (f not in one_gene and f not in two_genes and m in one_gene):
-    			pb=0.01*0.5    			
-    		
-    		elif (m not in one_gene and m not in two_genes and f in two_genes) or (f not in one_gene and f not in two_genes and m in two_genes):
-    			pb=0.01*0.99
-
-    		elif (m not in one_gene and m not in two_genes and f not in one_gene and f not in two_genes):
-    			pb=0.01*0.01
-
-    		if person in have_trait	:
-    			pb*=PROBS['trait'][2][True]
-    		if person not in have_trait:
-    			pb*=PROBS['trait'][2][False]
-    			
-    		prob_arr.append(pb)	
-
-
-    	else:
-    		if person in have_trait:
-    			prob_arr.append(PROBS['gene'][2]*PROBS['trait'][2][True])
-
-    		else:
-    			prob_arr.append(PROBS['gene'][2]*PROBS['trait'][2][False])
-
-
-    
-    for person in set(people)-one_gene- two_genes:
-    	pb=0
-
-    	if people[person]['mother'] is not None and people[person]['father'] is not None:
-    		m=people[person]['mother']
-    		f=people[person]['father']
-
-    		if m in one_gene and f in one_gene:
-    			pb=0.5*0.5
-
-    		elif (m in one_gene and f in two_genes) or (f in one_gene and m in two_genes):
-    			pb=0.5*0.01
-
-    		elif m in two_genes and f in two_genes:
-    			pb=0.01*0.01
-
-    		elif (m not in one_gene and m not in two_genes and f in one_gene) or (f not in one_gene and f not in two_genes and m in one_gene):
-    			pb=0.99*0.5    			
-    		
-    		elif (m not in one_gene and m not in two_genes and f in two_genes) or (f not in one_gene and f not in two_genes and m in two_genes):
-    			pb=0.99*0.01
+    names = list(people)
+    genes = [[2 if person in two_genes else 1 if person in one_gene else 0 for person in names]]
+    traits = [[person in have_trait for person in names]]
+    return float(joint_probabilities(people, genes, traits)[0])
 
-    		elif (m not in one_gene and m not in two_genes and f not in one_gene and f not in two_genes):
-    			pb=0.99*0.99
-
-    		if person in have_trait	:
-    			pb*=PROBS['trait'][0][True]
-    		if person not in have_trait:
-    			pb*=PROBS['trait'][0][False]
-    			
-    		prob_arr.append(pb)	
 
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return the logarithm of the joint probability of
+    `joint_probability`, which stays finite in families large enough
+    for the probability itself to round to 0.
+    """
+    names = list(people)
+    genes = [[2 if person in two_genes else 1 if person in one_gene else 0 for person in names]]
+    traits = [[person in have_trait for person in names]]
+    return float(log_joint_probabilities(people, genes, traits)[0])
 
-    	else:
-    		if person in have_trait:
-    			prob_arr.append(PROBS['gene'][0]*PROBS['trait'][0][True])
 
-    		else:
-    			prob_arr.append(PROBS['gene'][0]*PROBS['trait'][0][False])
+def joint_probabilities(people, genes, traits):
+    """
+    Compute the joint probabilities of a whole batch of assignments.
 
+    `genes` and `traits` have one row per assignment and one column per
+    person, in the order of `people`: how many copies of the gene each
+    person has, and whether they have the trait. Returns an array with
+    the joint probability of each row.
+    """
+    return np.exp(log_joint_probabilities(people, genes, traits))
 
-    jp=1
-    
-    for pb in prob_arr:
-    	jp*=pb
 
-    return jp
+def log_joint_probabilities(people, genes, traits):
+    """
+    Like `joint_probabilities`, but return the logarithms of the joint
+    probabilities, as sums of the logarithms of every person's factor.
+    """
+    gene, trait, inherited = log_probability_tables()
+    genes = np.asarray(genes, dtype=np.intp)
+    traits = np.asarray(traits, dtype=np.intp)
 
-    raise NotImplementedError
+    column = {person: i for i, person in enumerate(people)}
+    founders, children, mothers, fathers = [], [], [], []
+    for person in people:
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother is None or father is None:
+            founders.append(column[person])
+        else:
+            children.append(column[person])
+            mothers.append(column[mother])
+            fathers.append(column[father])
+
+    return (
+        gene[genes[:, founders]].sum(axis=1)
+        + inherited[genes[:, mothers], genes[:, fathers], genes[:, children]].sum(axis=1)
+        + trait[genes, traits].sum(axis=1)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def probability_tables():
+    """
+    Return PROBS as arrays indexed by numbers of copies of the gene:
+    (gene, trait, inherited), where
+        * `gene[g]` is the probability of having g copies unconditionally,
+        * `trait[g, t]` is the probability of trait t (0 or 1) given g copies, and
+        * `inherited[m, f, g]` is the probability of a child having g copies
+          given that their mother has m and their father f.
+
+    The tables are only built once, on first use.
+    """
+    gene = np.zeros(3)
+    trait = np.zeros((3, 2))
+    inherited = np.zeros((3, 3, 3))
+    for genes in GENES:
+        gene[genes] = PROBS["gene"][genes]
+        trait[genes] = PROBS["trait"][genes][False], PROBS["trait"][genes][True]
+        for m in GENES:
+            for f in GENES:
+                inherited[m, f, genes] = inheritance(m, f)[genes]
+    for table in (gene, trait, inherited):
+        table.flags.writeable = False
+    return gene, trait, inherited
+
+
+@functools.lru_cache(maxsize=None)
+def log_probability_tables():
+    """
+    Return the logarithms of the tables of `probability_tables`.
+    """
+    with np.errstate(divide="ignore"):
+        tables = tuple(np.log(table) for table in probability_tables())
+    for table in tables:
+        table.flags.writeable = False
+    return tables
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -323,5 +386,543 @@ def normalize(probabilities):
     # raise NotImplementedError
 
 
+def log_normalize(log_probabilities):
+    """
+    Turn the logarithms in `log_probabilities` into normalized
+    probabilities, in place. Each distribution is scaled by its
+    largest value first, so none of them rounds to 0.
+    """
+    for person in log_probabilities:
+        for field in log_probabilities[person]:
+            distribution = log_probabilities[person][field]
+            total = logsumexp(distribution.values())
+            if total == -math.inf:
+                raise ValueError(f"Every {field} of {person} is impossible")
+            for value in distribution:
+                distribution[value] = math.exp(distribution[value] - total)
+
+
+def log_add(a, b):
+    """
+    Return log(e^a + e^b).
+    """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+def logsumexp(values):
+    """
+    Return the logarithm of the sum of e^value for every value in `values`.
+    """
+    values = list(values)
+    top = max(values, default=-math.inf)
+    if top == -math.inf:
+        return top
+    return top + math.log(math.fsum(math.exp(value - top) for value in values))
+
+
+def infer(people):
+    """
+    Compute gene and trait probabilities for each person, given the
+    known traits, by exact inference on the pedigree as a Bayesian
+    network over each person's gene count.
+
+    The genes are eliminated one person at a time, fewest relatives
+    first, which builds a junction tree of small cliques. Messages are
+    passed up and down that tree once (Shafer-Shenoy), which gives every
+    person's gene distribution in time linear in the size of the family
+    for pedigrees without many marriages between relatives.
+
+    Returns the same normalized distributions as `enumerate_probabilities`.
+    """
+    order, cliques, parent = junction_tree(people)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Give each person's factor to the clique of whoever in it goes first
+    potentials = {person: [] for person in order}
+    for factor in gene_factors(people):
+        first = min(factor[0], key=position.__getitem__)
+        potentials[first].append(factor)
+
+    children = {person: [] for person in order}
+    for person in order:
+        if parent[person] is not None:
+            children[parent[person]].append(person)
+
+    # Collect: messages from the leaves of the tree towards the roots
+    up = dict()
+    for person in order:
+        incoming = [up[child] for child in children[person]]
+        if parent[person] is not None:
+            up[person] = sum_product(potentials[person] + incoming, cliques[person] - {person})
+
+    # Distribute: messages from the roots back down to the leaves
+    down = dict()
+    for person in reversed(order):
+        incoming = [down[person]] if parent[person] is not None else []
+        for child in children[person]:
+            others = [up[other] for other in children[person] if other != child]
+            down[child] = sum_product(potentials[person] + incoming + others, cliques[child] - {child})
+
+    probabilities = empty_probabilities(people)
+    for person in order:
+        incoming = [up[child] for child in children[person]]
+        if parent[person] is not None:
+            incoming.append(down[person])
+        _, table = sum_product(potentials[person] + incoming, {person})
+        for (genes,), p in table.items():
+            probabilities[person]["gene"][genes] = p
+
+    add_traits(people, probabilities)
+    return probabilities
+
+
+def add_traits(people, probabilities):
+    """
+    Fill in everyone's trait distribution in `probabilities` from their
+    gene distribution, or from their trait if it is known.
+    """
+    for person in people:
+        trait = people[person]["trait"]
+        for value in (True, False):
+            if trait is None:
+                probabilities[person]["trait"][value] = sum(
+                    probabilities[person]["gene"][genes] * PROBS["trait"][genes][value]
+                    for genes in GENES
+                )
+            else:
+                probabilities[person]["trait"][value] = 1 if value == trait else 0
+
+
+def gene_factors(people):
+    """
+    Return one factor per person: the probability of their gene count
+    given their parents' gene counts (or unconditionally, for people
+    without parents), times the probability of their trait if known.
+
+    A factor is a pair (variables, table), where `variables` is a tuple
+    of people and `table` maps each tuple of their gene counts to a
+    probability.
+    """
+    inherited = {(m, f): inheritance(m, f) for m in GENES for f in GENES}
+    factors = []
+    for person in people:
+        trait = people[person]["trait"]
+        evidence = {
+            genes: 1 if trait is None else PROBS["trait"][genes][trait]
+            for genes in GENES
+        }
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother is None or father is None:
+            factors.append(((person,), {
+                (genes,): PROBS["gene"][genes] * evidence[genes]
+                for genes in GENES
+            }))
+        else:
+            factors.append(((person, mother, father), {
+                (genes, m, f): inherited[m, f][genes] * evidence[genes]
+                for genes in GENES for m in GENES for f in GENES
+            }))
+    return factors
+
+
+def inheritance(mother, father):
+    """
+    Return the probability distribution of a child's gene count,
+    given the gene counts of their mother and father.
+    """
+    m = passes_gene(mother)
+    f = passes_gene(father)
+    return {
+        2: m * f,
+        1: m * (1 - f) + (1 - m) * f,
+        0: (1 - m) * (1 - f)
+    }
+
+
+def passes_gene(genes):
+    """
+    Return the probability that a parent with `genes` copies of the
+    gene passes one on to their child, allowing for mutation.
+    """
+    mutation = PROBS["mutation"]
+    return {
+        2: 1 - mutation,
+        1: 0.5,
+        0: mutation
+    }[genes]
+
+
+def junction_tree(people):
+    """
+    Choose an order to eliminate everyone's genes in, and return
+    (order, cliques, parent).
+
+    `cliques[person]` is the set of people whose genes are still linked
+    to `person`'s when they are eliminated, themselves included, and
+    `parent[person]` is whoever in that clique is eliminated next, or
+    None. Together they form a junction tree.
+
+    People are linked to their parents and parents to each other. The
+    next person eliminated is always one with the fewest links left.
+    """
+    links = {person: set() for person in people}
+    for person in people:
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother is not None and father is not None:
+            for a, b in ((person, mother), (person, father), (mother, father)):
+                links[a].add(b)
+                links[b].add(a)
+
+    # Ties go to later people in the file, who tend to be descendants
+    rank = {person: i for i, person in enumerate(people)}
+    heap = [(len(links[person]), -rank[person], person) for person in people]
+    heapq.heapify(heap)
+
+    order = []
+    cliques = dict()
+    while heap:
+        degree, _, person = heapq.heappop(heap)
+        if person in cliques or degree != len(links[person]):
+            continue
+        order.append(person)
+        neighbors = links.pop(person)
+        cliques[person] = neighbors | {person}
+
+        # Everyone left in the clique becomes linked to each other
+        for neighbor in neighbors:
+            links[neighbor].discard(person)
+            links[neighbor] |= neighbors - {neighbor}
+            heapq.heappush(heap, (len(links[neighbor]), -rank[neighbor], neighbor))
+
+    position = {person: i for i, person in enumerate(order)}
+    parent = {
+        person: min(cliques[person] - {person}, key=position.__getitem__, default=None)
+        for person in order
+    }
+    return order, cliques, parent
+
+
+def sum_product(factors, keep):
+    """
+    Multiply `factors` together and sum out every variable not in
+    `keep`. Return the resulting factor, scaled to sum to 1.
+
+    The product of hundreds of factors (one per child, for a couple with
+    many children) is too small for floats, so each product is taken as
+    a sum of logarithms and scaled by the largest before summing.
+    Raises ValueError if every assignment is impossible.
+    """
+    variables = []
+    for factor_variables, _ in factors:
+        for variable in factor_variables:
+            if variable not in variables:
+                variables.append(variable)
+    for variable in keep:
+        if variable not in variables:
+            variables.append(variable)
+    kept = tuple(variable for variable in variables if variable in keep)
+
+    index = {variable: i for i, variable in enumerate(variables)}
+    lookups = [
+        (
+            picker([index[variable] for variable in factor_variables]),
+            {key: math.log(p) if p > 0 else -math.inf for key, p in table.items()}
+        )
+        for factor_variables, table in factors
+    ]
+    pick_kept = picker([index[variable] for variable in kept])
+
+    logs = []
+    for assignment in itertools.product(GENES, repeat=len(variables)):
+        log_p = 0.0
+        for pick, table in lookups:
+            log_p += table[pick(assignment)]
+            if log_p == -math.inf:
+                break
+        logs.append((pick_kept(assignment), log_p))
+
+    top = max(log_p for _, log_p in logs)
+    if top == -math.inf:
+        raise ValueError(f"Every assignment of genes to {', '.join(variables)} is impossible")
+    result = dict()
+    for key, log_p in logs:
+        result[key] = result.get(key, 0) + math.exp(log_p - top)
+
+    total = sum(result.values())
+    for key in result:
+        result[key] /= total
+    return kept, result
+
+
+def picker(positions):
+    """
+    Return a function picking the items at `positions` out of a tuple,
+    always as a tuple.
+    """
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda items: (items[position],)
+    if not positions:
+        return lambda items: ()
+    return operator.itemgetter(*positions)
+
+
+def sample_probabilities(people, method="gibbs", samples=SAMPLES, chains=CHAINS, seed=None,
+                         workers=WORKERS, diagnostics=None):
+    """
+    Estimate gene and trait probabilities for each person, given the
+    known traits, from `samples` random assignments of genes, for
+    pedigrees too large or too inbred for `infer`.
+
+    `method` is one of SAMPLERS:
+        * "weighting" draws everyone's genes from their parents' and
+          weighs each draw by how likely it makes the known traits
+          (see `likelihood_weighting`), and
+        * "gibbs" redraws one person's genes at a time given everyone
+          else's (see `gibbs_sampling`).
+
+    The samples are split between `chains` independent chains, each
+    drawing from its own NumPy generator spawned from `seed`. Chains
+    are run by a pool of `workers` processes once there are at least
+    PARALLEL_DRAWS genes to draw.
+
+    If `diagnostics` is a dictionary, it is filled with
+        * "standard_error": the largest standard error of any gene
+          probability, from how much the chains disagree,
+        * "r_hat": for Gibbs sampling, the largest Gelman-Rubin
+          statistic of any gene probability; close to 1 once the chains
+          have converged, and
+        * "effective_samples": for likelihood weighting, how many
+          unweighted samples the weighted ones are worth.
+
+    Returns the same distributions as `infer`.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"Unknown sampling method: {method}")
+    chains = max(1, min(chains, samples))
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    tasks = [(method, people, samples // chains + (i < samples % chains), seeds[i]) for i in range(chains)]
+    if workers > 1 and chains > 1 and len(people) * samples >= PARALLEL_DRAWS:
+        with multiprocessing.Pool(min(workers, chains)) as pool:
+            results = pool.map(run_chain, tasks)
+    else:
+        results = list(map(run_chain, tasks))
+
+    if method == "weighting":
+        # Bring every chain's weights to the scale of the largest
+        scale = max(s for _, _, _, s in results)
+        shrinks = [np.exp(s - scale) for _, _, _, s in results]
+        weight = sum(w * shrink for (_, w, _, _), shrink in zip(results, shrinks))
+        squares = sum(w2 * shrink ** 2 for (_, _, w2, _), shrink in zip(results, shrinks))
+        totals = sum(genes * shrink for (genes, _, _, _), shrink in zip(results, shrinks)) / weight
+        estimates = [genes / w for genes, w, _, _ in results]
+        if diagnostics is not None:
+            diagnostics["effective_samples"] = float(weight ** 2 / squares)
+    else:
+        sweeps = np.array([n for _, _, n in results])
+        estimates = [sums / n for sums, _, n in results]
+        totals = sum(sums for sums, _, _ in results) / sweeps.sum()
+        if diagnostics is not None and chains > 1:
+            diagnostics["r_hat"] = gelman_rubin(results)
+
+    if diagnostics is not None:
+        spread = np.std(estimates, axis=0, ddof=1) if chains > 1 else np.full_like(totals, np.nan)
+        diagnostics["standard_error"] = float(spread.max(initial=0) / np.sqrt(chains))
+
+    probabilities = empty_probabilities(people)
+    for person, row in zip(people, totals.tolist()):
+        for genes in GENES:
+            probabilities[person]["gene"][genes] = row[genes]
+    add_traits(people, probabilities)
+    return probabilities
+
+
+def run_chain(task):
+    """
+    Run one chain of `sample_probabilities`, given as a tuple
+    (method, people, samples, seed).
+    """
+    method, people, samples, seed = task
+    return SAMPLERS[method](people, samples, np.random.default_rng(seed))
+
+
+def likelihood_weighting(people, samples, rng):
+    """
+    Draw `samples` assignments of genes, parents before their children,
+    each child's genes from what their parents' genes pass on. Weigh
+    every assignment by the probability of the known traits given it.
+
+    Return (genes, weight, squares, scale): `genes[i, g]` is the total
+    weight of the assignments giving person number `i` g copies of the
+    gene, `weight` the total weight and `squares` the sum of squared
+    weights. With many known traits the weights are far too small for
+    floats, so they are all divided by e ** `scale`, the largest of them.
+    """
+    order, mothers, fathers, evidence = pedigree(people)
+    with np.errstate(divide="ignore"):
+        log_evidence = np.log(evidence)
+    genes = np.zeros((len(people), 3))
+    weight = squares = 0.0
+    scale = -np.inf
+    for start in range(0, samples, SAMPLE_BATCH):
+        assignments = forward_sample(order, mothers, fathers, min(SAMPLE_BATCH, samples - start), rng)
+        log_weights = log_evidence[np.arange(len(people)), assignments].sum(axis=1)
+
+        # Rescale what was added so far whenever a larger weight comes up
+        top = log_weights.max()
+        if top > scale:
+            shrink = np.exp(scale - top)
+            genes *= shrink
+            weight *= shrink
+            squares *= shrink ** 2
+            scale = top
+
+        weights = np.exp(log_weights - scale)
+        for i in range(len(people)):
+            genes[i] += np.bincount(assignments[:, i], weights=weights, minlength=3)
+        weight += weights.sum()
+        squares += (weights ** 2).sum()
+    return genes, weight, squares, scale
+
+
+def gibbs_sampling(people, samples, rng):
+    """
+    Draw `samples` assignments of genes by Gibbs sampling, with up to
+    WALKERS chains of assignments updated in step.
+
+    Each walker starts from an assignment drawn like in
+    `likelihood_weighting` and sweeps over everyone BURN_IN times
+    unrecorded. Every sweep redraws each person's genes given their
+    parents', their trait and their children's (with the children's
+    other parents). Sweeps are recorded by averaging the distribution
+    each person's genes were redrawn from over the walkers.
+
+    Return (sums, squares, sweeps): the sum and sum of squares over the
+    recorded sweeps of each person's average gene distribution, as
+    (people, 3) arrays, and how many sweeps were recorded.
+    """
+    gene, _, inherited = probability_tables()
+    order, mothers, fathers, evidence = pedigree(people)
+    walkers = max(1, min(WALKERS, samples))
+    sweeps = max(1, samples // walkers)
+
+    # Each child, with their other parent, and whether this is the mother
+    children = [[] for _ in people]
+    for child in order:
+        if mothers[child] >= 0:
+            children[mothers[child]].append((child, fathers[child], True))
+            children[fathers[child]].append((child, mothers[child], False))
+
+    assignments = forward_sample(order, mothers, fathers, walkers, rng)
+    sums = np.zeros((len(people), 3))
+    squares = np.zeros((len(people), 3))
+    for sweep in range(BURN_IN + sweeps):
+        for i in order:
+            if mothers[i] < 0:
+                p = np.tile(gene, (walkers, 1))
+            else:
+                p = inherited[assignments[:, mothers[i]], assignments[:, fathers[i]]]
+            p = p * evidence[i]
+            for child, other, mother in children[i]:
+                if mother:
+                    p *= inherited[:, assignments[:, other], assignments[:, child]].T
+                else:
+                    p *= inherited[assignments[:, other], :, assignments[:, child]]
+            p /= p.sum(axis=1, keepdims=True)
+            assignments[:, i] = draw(p, rng)
+            if sweep >= BURN_IN:
+                average = p.mean(axis=0)
+                sums[i] += average
+                squares[i] += average ** 2
+    return sums, squares, sweeps
+
+
+def gelman_rubin(results):
+    """
+    Return the largest Gelman-Rubin statistic of any gene probability,
+    given the (sums, squares, sweeps) of several Gibbs sampling chains.
+    """
+    n = min(sweeps for _, _, sweeps in results)
+    means = np.array([sums / sweeps for sums, _, sweeps in results])
+    variances = np.array([
+        (squares - sweeps * mean ** 2) / max(1, sweeps - 1)
+        for (_, squares, sweeps), mean in zip(results, means)
+    ])
+    within = np.maximum(variances.mean(axis=0), 0)
+    between = n * means.var(axis=0, ddof=1)
+    pooled = (n - 1) / n * within + between / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_hat = np.sqrt(np.where(within > 0, pooled / within, 1))
+    return float(r_hat.max(initial=1))
+
+
+def pedigree(people):
+    """
+    Return (order, mothers, fathers, evidence), with people numbered
+    in the order of `people`: everyone's number with parents before
+    their children, the numbers of everyone's mother and father (-1 for
+    people without parents), and the probability of everyone's known
+    trait given each gene count (1 if unknown), as a (people, 3) array.
+    """
+    _, trait, _ = probability_tables()
+    number = {person: i for i, person in enumerate(people)}
+    mothers = np.full(len(people), -1, dtype=np.intp)
+    fathers = np.full(len(people), -1, dtype=np.intp)
+    evidence = np.ones((len(people), 3))
+    for person, i in number.items():
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother is not None and father is not None:
+            mothers[i], fathers[i] = number[mother], number[father]
+        if people[person]["trait"] is not None:
+            evidence[i] = trait[:, int(people[person]["trait"])]
+
+    # Place everyone whose parents are placed, until nobody is left
+    order = []
+    placed = np.zeros(len(people), dtype=bool)
+    waiting = list(range(len(people)))
+    while waiting:
+        ready = [i for i in waiting if mothers[i] < 0 or (placed[mothers[i]] and placed[fathers[i]])]
+        if not ready:
+            raise ValueError("Pedigree has someone among their own ancestors")
+        order.extend(ready)
+        placed[ready] = True
+        waiting = [i for i in waiting if not placed[i]]
+    return order, mothers, fathers, evidence
+
+
+def forward_sample(order, mothers, fathers, n, rng):
+    """
+    Return `n` assignments of genes drawn without looking at the
+    traits, parents before their children, as an (n, people) array.
+    """
+    gene, _, inherited = probability_tables()
+    assignments = np.zeros((n, len(order)), dtype=np.intp)
+    for i in order:
+        if mothers[i] < 0:
+            p = np.broadcast_to(gene, (n, 3))
+        else:
+            p = inherited[assignments[:, mothers[i]], assignments[:, fathers[i]]]
+        assignments[:, i] = draw(p, rng)
+    return assignments
+
+
+def draw(p, rng):
+    """
+    Return a gene count drawn from each row of distributions `p`.
+    """
+    u = rng.random((len(p), 1))
+    return np.minimum((u > p.cumsum(axis=1)).sum(axis=1), 2)
+
+
+SAMPLERS = {
+    "weighting": likelihood_weighting,
+    "gibbs": gibbs_sampling
+}
+
+
 if __name__ == "__main__":
     main()
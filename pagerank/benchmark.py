@@ -0,0 +1,285 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import pagerank
+
+CORPORA = ("corpus0", "corpus1", "corpus2")
+
+# Sizes of the synthetic power-law corpora, before scaling
+SYNTHETIC_PAGES = (10000, 100000)
+
+# Out-degrees follow a Zipf law with this exponent, capped at MAX_LINKS
+OUT_DEGREE_EXPONENT = 2.0
+MAX_LINKS = 200
+
+# Link targets are drawn as N * u ** SKEW for uniform u, so low-numbered
+# pages collect most in-links, with a power-law in-degree tail
+SKEW = 3
+
+SEED = 50
+
+DAMPING_FACTORS = (0.85, 0.99)
+TOLERANCE = 1e-6
+
+# Samples drawn per page when timing sample_pagerank
+SAMPLES_PER_PAGE = 10
+
+# Single-page teleport distributions solved by personalized PageRank,
+# together and one at a time
+PERSONALIZED_QUERIES = 32
+
+# Random single-page edits checked by --updates; some give a page its
+# first link or take away its last one
+UPDATE_EDITS = 200
+
+USAGE = "Usage: python benchmark.py [scale] [--exponent value] [--html] [--json] [--solvers] [--updates]"
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{name}</title>
+    </head>
+    <body>
+        <h1>{name}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+
+LINK = """            <li><a href="{target}">{name}</a></li>"""
+
+
+def main():
+	args = sys.argv[1:]
+	flags = {flag for flag in ("--html", "--json", "--solvers", "--updates") if flag in args}
+	args = [arg for arg in args if arg not in flags]
+	exponent = OUT_DEGREE_EXPONENT
+	if "--exponent" in args:
+		i = args.index("--exponent")
+		if i + 1 == len(args):
+			sys.exit(USAGE)
+		exponent = float(args[i + 1])
+		del args[i:i + 2]
+	if len(args) > 1:
+		sys.exit(USAGE)
+	scale = float(args[0]) if args else 1.0
+	sizes = [max(2, int(pages * scale)) for pages in SYNTHETIC_PAGES]
+
+	if "--solvers" in flags:
+		for directory in CORPORA:
+			compare_solvers(directory, pagerank.crawl(directory, cache=False))
+		for pages in sizes:
+			compare_solvers(f"power-law ({pages} pages)", generate(pages, exponent))
+		return
+
+	if "--updates" in flags:
+		for directory in CORPORA:
+			check_updates(directory, pagerank.crawl(directory, cache=False))
+		for pages in sizes:
+			check_updates(f"power-law ({pages} pages)", generate(pages, exponent))
+		return
+
+	report = print_json if "--json" in flags else print_result
+	for pages in sizes:
+		corpus = generate(pages, exponent)
+		if "--html" in flags:
+			with tempfile.TemporaryDirectory() as directory:
+				write_corpus(directory, corpus)
+				for result in run(f"power-law-{pages}", corpus, directory):
+					report(result)
+		else:
+			for result in run(f"power-law-{pages}", corpus):
+				report(result)
+
+
+def run(label, corpus, directory=None):
+	"""
+	Time `crawl` (if `corpus` was written to `directory`),
+	`sample_pagerank`, building the LinkMatrix, and `iterate_pagerank`
+	with every solver on `corpus`, then personalized PageRank for
+	PERSONALIZED_QUERIES teleport pages, together and one at a time.
+
+	Yields one result dictionary per step, with its time, throughput in
+	links per second and the peak memory traced while running it. Each
+	step of a random surfer counts as one link, and every sweep of a
+	solver as `links` links.
+	"""
+	pages = len(corpus)
+	links = sum(len(targets) for targets in corpus.values())
+	result = {"corpus": label, "pages": pages, "links": links}
+
+	if directory is not None:
+		seconds, peak, _ = measure(lambda: pagerank.crawl(directory, cache=False))
+		yield dict(result, step="crawl", seconds=seconds, links_per_second=links / seconds, peak_bytes=peak)
+
+	samples = SAMPLES_PER_PAGE * pages
+	seconds, peak, _ = measure(lambda: pagerank.sample_pagerank(corpus, pagerank.DAMPING, samples, seed=SEED))
+	steps = samples + pagerank.BURN_IN * min(pagerank.WALKERS, samples)
+	yield dict(result, step="sample", samples=samples, seconds=seconds, links_per_second=steps / seconds, peak_bytes=peak)
+
+	seconds, peak, matrix = measure(lambda: pagerank.LinkMatrix(corpus))
+	yield dict(result, step="link-matrix", seconds=seconds, links_per_second=links / seconds, peak_bytes=peak)
+
+	for method, solver in pagerank.SOLVERS.items():
+		_, iterations = solver(matrix, pagerank.DAMPING, TOLERANCE)
+		seconds, peak, _ = measure(
+			lambda: pagerank.iterate_pagerank(corpus, pagerank.DAMPING, TOLERANCE, method=method)
+		)
+		yield dict(
+			result, step=f"iterate-{method}", iterations=iterations, seconds=seconds,
+			links_per_second=links * iterations / seconds, peak_bytes=peak
+		)
+
+	teleports = [{page: 1} for page in list(corpus)[::max(1, pages // PERSONALIZED_QUERIES)][:PERSONALIZED_QUERIES]]
+	solves = {
+		"batched": lambda: pagerank.personalized_pagerank(matrix, pagerank.DAMPING, teleports, TOLERANCE),
+		"single": lambda: [pagerank.personalized_pagerank(matrix, pagerank.DAMPING, [teleport], TOLERANCE) for teleport in teleports]
+	}
+	for mode, solve in solves.items():
+		seconds, peak, _ = measure(solve)
+		yield dict(
+			result, step=f"personalized-{mode}", queries=len(teleports), seconds=seconds,
+			queries_per_second=len(teleports) / seconds, peak_bytes=peak
+		)
+
+
+def measure(function):
+	"""
+	Call `function` twice: once timed, once with tracemalloc tracing
+	its allocations, since tracing slows Python code down.
+
+	Return (seconds, peak bytes allocated, result of the timed call).
+	"""
+	start = time.perf_counter()
+	result = function()
+	seconds = time.perf_counter() - start
+
+	tracemalloc.start()
+	try:
+		function()
+		_, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	return seconds, peak, result
+
+
+def print_result(result):
+	details = f", {result['iterations']} sweeps" if "iterations" in result else ""
+	if "queries_per_second" in result:
+		rate = f"{result['queries_per_second']:,.1f} queries/s"
+	else:
+		rate = f"{result['links_per_second']:,.0f} links/s"
+	print(
+		f"{result['corpus']} {result['step']}: {result['seconds']:.3f}s{details}, "
+		f"{rate}, peak {result['peak_bytes'] / 2 ** 20:.1f} MiB"
+	)
+
+
+def print_json(result):
+	print(json.dumps(result), flush=True)
+
+
+def compare_solvers(label, corpus):
+	"""
+	Run every PageRank solver on `corpus` for each damping factor and
+	print how many sweeps and how long it took to reach TOLERANCE, and
+	how far the result is from a tightly converged reference (L1 norm).
+	"""
+	links = pagerank.LinkMatrix(corpus)
+	print(f"{label}: {len(links)} pages, {len(links.targets)} links")
+	for d in DAMPING_FACTORS:
+		reference, _ = pagerank.power_iteration(links, d, TOLERANCE * 1e-6, 100 * pagerank.MAX_ITERATIONS)
+		print(f"  damping {d}")
+		for method, solver in pagerank.SOLVERS.items():
+			start = time.perf_counter()
+			ranks, iterations = solver(links, d, TOLERANCE)
+			elapsed = time.perf_counter() - start
+			error = np.abs(ranks - reference).sum()
+			print(f"    {method:>14}: {iterations:4} sweeps in {elapsed:.3f}s, error {error:.1e}")
+
+
+def check_updates(label, corpus):
+	"""
+	Apply UPDATE_EDITS random single-page edits to `corpus`, one at a
+	time, and compare the ranks `update_pagerank` pushes locally with a
+	tightly converged power iteration on the edited corpus. Print the
+	largest error (L1 norm) of edits that change whether the page has
+	links and of those that do not, and exit if either is well above
+	TOLERANCE.
+	"""
+	rng = np.random.default_rng(SEED)
+	d = pagerank.DAMPING
+	pages = list(corpus)
+	links = pagerank.LinkMatrix(corpus)
+	ranks = links.as_dict(pagerank.power_iteration(links, d, TOLERANCE * 1e-6, 100 * pagerank.MAX_ITERATIONS)[0])
+
+	errors = {"dangling": 0.0, "other": 0.0}
+	for page in rng.choice(pages, min(UPDATE_EDITS, len(pages)), replace=False).tolist():
+		others = [other for other in pages if other != page]
+		if not others:
+			break
+		if corpus[page] and rng.random() < 0.5:
+			new_links = set()
+		else:
+			new_links = set(rng.choice(others, min(3, len(others)), replace=False).tolist())
+		edited = dict(corpus, **{page: new_links})
+
+		updated = pagerank.update_pagerank(edited, d, ranks, pagerank.diff_corpus(corpus, edited), TOLERANCE, local=True)
+		links = pagerank.LinkMatrix(edited)
+		reference = links.as_dict(pagerank.power_iteration(links, d, TOLERANCE * 1e-6, 100 * pagerank.MAX_ITERATIONS)[0])
+		error = sum(abs(updated[other] - reference[other]) for other in pages)
+		kind = "dangling" if bool(corpus[page]) != bool(new_links) else "other"
+		errors[kind] = max(errors[kind], error)
+
+	print(f"{label}: largest update error {errors['dangling']:.1e} gaining or losing every link, {errors['other']:.1e} otherwise")
+	if max(errors.values()) > 10 * TOLERANCE:
+		sys.exit(f"{label}: local updates are further than {TOLERANCE} from power iteration")
+
+
+def generate(pages, exponent=OUT_DEGREE_EXPONENT, seed=SEED):
+	"""
+	Return a synthetic corpus of `pages` pages named "0.html", ...
+	whose out-degrees follow a Zipf law with `exponent` and whose
+	in-degrees have a power-law tail. The same arguments always give
+	the same corpus.
+	"""
+	rng = np.random.default_rng(seed)
+	names = [f"{i}.html" for i in range(pages)]
+	degrees = np.minimum(rng.zipf(exponent, pages), min(MAX_LINKS, pages - 1))
+	targets = np.minimum((pages * rng.random(degrees.sum()) ** SKEW).astype(np.int64), pages - 1)
+
+	corpus = dict()
+	position = 0
+	for i, degree in enumerate(degrees.tolist()):
+		links = set(targets[position:position + degree].tolist())
+		links.discard(i)
+		corpus[names[i]] = {names[link] for link in links}
+		position += degree
+	return corpus
+
+
+def write_corpus(directory, corpus):
+	"""
+	Write every page of `corpus` into `directory` as an HTML file
+	laid out like the pages of corpus0.
+	"""
+	for page, links in corpus.items():
+		with open(os.path.join(directory, page), "w") as f:
+			f.write(PAGE.format(
+				name=page[:-len(".html")],
+				links="\n".join(LINK.format(target=target, name=target[:-len(".html")]) for target in sorted(links))
+			))
+
+
+if __name__ == "__main__":
+	main()
@@ -1,11 +1,67 @@
+import functools
+import itertools
+import json
+import multiprocessing
 import os
-import random
 import re
+import struct
 import sys
 
+import numpy as np
+from scipy import sparse
+
 DAMPING = 0.85
 SAMPLES = 10000
 
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read from an HTML file at a time while crawling
+BLOCK_SIZE = 1 << 16
+
+# Smaller corpora are crawled in this process, larger ones by WORKERS processes
+PARALLEL_PAGES = 2000
+WORKERS = os.cpu_count() or 1
+CRAWL_CHUNK_SIZE = 256
+
+# Edge files written by crawl_edges: magic, then page and link counts
+EDGES_MAGIC = b"PREDGES\x01"
+EDGES_HEADER = struct.Struct("<8sqq")
+EDGE_TYPE = np.int32
+
+# Links streamed from an edge file at a time
+EDGE_BLOCK = 1 << 20
+
+# Links of every page, with the mtime and size they were read at
+CACHE_NAME = "links.cache"
+CACHE_VERSION = 1
+
+# Random surfers moving in parallel while sampling
+WALKERS = 1000
+
+# Unrecorded steps every surfer takes first; 0.85 ** 60 < 0.0001
+BURN_IN = 60
+
+# Iteration stops once the ranks move less than this in total (L1 norm)
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
+
+# Pages updated together by one Gauss-Seidel step, and the fewest
+# steps a sweep is split into
+SEIDEL_BLOCK = 1024
+SEIDEL_BLOCKS = 64
+
+# Sweeps between two quadratic extrapolations
+EXTRAPOLATE_EVERY = 10
+
+# Sweeps between two full sweeps of adaptive iteration
+ADAPTIVE_REFRESH = 10
+
+# Teleport distributions solved together by personalized PageRank
+PERSONALIZED_BLOCK = 32
+
+# Ranks of a block updated at a time after each sweep, to stay in cache
+PERSONALIZED_CHUNK = 1 << 15
+
 
 def main():
 	if len(sys.argv) != 2:
@@ -21,22 +77,46 @@ def main():
 		print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, workers=WORKERS, cache=True):
 	"""
 	Parse a directory of HTML pages and check for links to other pages.
 	Return a dictionary where each key is a page, and values are
 	a list of all other pages in the corpus that are linked to by the page.
+
+	Corpora of at least PARALLEL_PAGES pages are parsed by a pool of
+	`workers` processes. If `cache` is true, the links of every page
+	are kept in the directory's CACHE_NAME file, and only pages whose
+	mtime or size changed since are parsed again.
 	"""
-	pages = dict()
+	filenames = [
+		filename for filename in os.listdir(directory)
+		if filename.endswith(".html")
+	]
+	stats = [page_stats(os.path.join(directory, filename)) for filename in filenames]
+	cached = load_crawl_cache(directory) if cache else {}
+
+	# Extract all links from HTML files that are new or changed
+	stale = [
+		filename for filename, stat in zip(filenames, stats)
+		if cached.get(filename, (None,))[0] != stat
+	]
+	paths = [os.path.join(directory, filename) for filename in stale]
+	for filename, links in zip(stale, parse_pages(paths, workers)):
+		cached[filename] = (None, links)
 
-	# Extract all links from HTML files
-	for filename in os.listdir(directory):
-		if not filename.endswith(".html"):
-			continue
-		with open(os.path.join(directory, filename)) as f:
-			contents = f.read()
-			links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-			pages[filename] = set(links) - {filename}
+	pages = dict()
+	for filename in filenames:
+		pages[filename] = set(cached[filename][1]) - {filename}
+
+	# Rewrite the cache if pages were added, changed or removed
+	if cache and (stale or len(cached) != len(filenames)):
+		try:
+			write_crawl_cache(directory, {
+				filename: (stat, cached[filename][1])
+				for filename, stat in zip(filenames, stats)
+			})
+		except OSError:
+			pass
 
 	# Only include links to other pages in the corpus
 	for filename in pages:
@@ -48,6 +128,138 @@ def crawl(directory):
 	return pages
 
 
+def crawl_edges(directory, path, workers=WORKERS):
+	"""
+	Parse a directory of HTML pages like `crawl`, but write the links
+	to an edge file at `path` (see EdgeFile) as they are found, instead
+	of keeping them in memory.
+
+	Return the number of pages.
+	"""
+	filenames = [
+		filename for filename in os.listdir(directory)
+		if filename.endswith(".html")
+	]
+	index = {filename: i for i, filename in enumerate(filenames)}
+	degrees = np.zeros(len(filenames), dtype=EDGE_TYPE)
+	edges = 0
+
+	temporary = f"{path}.{os.getpid()}.tmp"
+	try:
+		with open(temporary, "wb") as f:
+			f.write(bytes(EDGES_HEADER.size))
+			paths = [os.path.join(directory, filename) for filename in filenames]
+			for source, links in enumerate(parse_pages(paths, workers)):
+				# Only include links to other pages in the corpus
+				targets = sorted(index[link] for link in links if link in index and index[link] != source)
+				pairs = np.empty((len(targets), 2), dtype=EDGE_TYPE)
+				pairs[:, 0] = source
+				pairs[:, 1] = targets
+				f.write(pairs.tobytes())
+				degrees[source] = len(targets)
+				edges += len(targets)
+			f.write(degrees.tobytes())
+			f.write(b"\0".join(filename.encode("utf-8") for filename in filenames))
+			f.seek(0)
+			f.write(EDGES_HEADER.pack(EDGES_MAGIC, len(filenames), edges))
+		os.replace(temporary, path)
+	finally:
+		if os.path.exists(temporary):
+			os.remove(temporary)
+	return len(filenames)
+
+
+def parse_pages(paths, workers=WORKERS):
+	"""
+	Yield the set of link targets of every HTML file in `paths`, in
+	order. At least PARALLEL_PAGES files are parsed by a pool of
+	`workers` processes.
+	"""
+	if workers > 1 and len(paths) >= PARALLEL_PAGES:
+		with multiprocessing.Pool(workers) as pool:
+			yield from pool.imap(read_links, paths, chunksize=CRAWL_CHUNK_SIZE)
+	else:
+		yield from map(read_links, paths)
+
+
+def page_stats(path):
+	"""
+	Return the [mtime_ns, size] the crawl cache records for `path`.
+	"""
+	st = os.stat(path)
+	return [st.st_mtime_ns, st.st_size]
+
+
+def cache_path(directory):
+	return os.path.join(directory, CACHE_NAME)
+
+
+def load_crawl_cache(directory):
+	"""
+	Return the crawl cache of `directory`, mapping each page to its
+	([mtime_ns, size], links), or an empty dict if there is none.
+	"""
+	try:
+		with open(cache_path(directory)) as f:
+			contents = json.load(f)
+	except (OSError, ValueError):
+		return {}
+	if not isinstance(contents, dict) or contents.get("version") != CACHE_VERSION:
+		return {}
+	return {
+		filename: (stat, links)
+		for filename, (stat, links) in contents["pages"].items()
+	}
+
+
+def write_crawl_cache(directory, pages):
+	"""
+	Write the crawl cache of `directory`, where `pages` maps each
+	page to its ([mtime_ns, size], links).
+	"""
+	path = cache_path(directory)
+	temporary = f"{path}.{os.getpid()}.tmp"
+	try:
+		with open(temporary, "w") as f:
+			json.dump({
+				"version": CACHE_VERSION,
+				"pages": {
+					filename: [stat, sorted(links)]
+					for filename, (stat, links) in pages.items()
+				}
+			}, f)
+		os.replace(temporary, path)
+	finally:
+		if os.path.exists(temporary):
+			os.remove(temporary)
+
+
+def read_links(path):
+	"""
+	Return the set of link targets in the HTML file at `path`.
+
+	The file is read BLOCK_SIZE characters at a time. Whatever follows
+	the last "<" of a block may be the start of a link cut in half, so
+	it is carried over and searched again with the next block, unless
+	it has grown longer than a block: no tag is that long.
+	"""
+	links = set()
+	tail = ""
+	with open(path) as f:
+		while True:
+			block = f.read(BLOCK_SIZE)
+			if not block:
+				break
+			buffer = tail + block
+			cut = buffer.rfind("<")
+			if cut < 0 or len(buffer) - cut > BLOCK_SIZE:
+				cut = len(buffer)
+			links.update(LINK.findall(buffer, 0, cut))
+			tail = buffer[cut:]
+	links.update(LINK.findall(tail))
+	return links
+
+
 def transition_model(corpus, page, damping_factor):
 	"""
 	Return a probability distribution over which page to visit next,
@@ -55,15 +267,17 @@ def transition_model(corpus, page, damping_factor):
 
 	With probability `damping_factor`, choose a link at random
 	linked to by `page`. With probability `1 - damping_factor`, choose
-	a link at random chosen from all pages in the corpus.
+	a link at random chosen from all pages in the corpus. A page with
+	no links is treated as linking to every page, itself included.
 	"""
 	prob_dis=dict()
 	d=damping_factor
+	links=corpus[page] or corpus.keys()
 
 	for key in corpus:
 		prob=0.0
-		if key in corpus[page]:
-			prob+=d/len(corpus[page])
+		if key in links:
+			prob+=d/len(links)
 		prob+=(1-d)/len(corpus)
 		prob_dis[key]=prob
 
@@ -72,86 +286,590 @@ def transition_model(corpus, page, damping_factor):
 	raise NotImplementedError
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, walkers=WALKERS, seed=None):
 	"""
 	Return PageRank values for each page by sampling `n` pages
 	according to transition model, starting with a page at random.
 
+	The samples are drawn by up to `walkers` random surfers moving in
+	parallel (see `random_walks`), from a NumPy generator seeded with
+	`seed`.
+
 	Return a dictionary where keys are page names, and values are
 	their estimated PageRank value (a value between 0 and 1). All
 	PageRank values should sum to 1.
 	"""
-	PageRanks=dict()
-	for key in corpus:
-		PageRanks[key]=0
-
-	page=random.choice(list(corpus))
-	PageRanks[page]+=1/n
-
-	for i in range(1,n):
-		prob_dis=transition_model(corpus,page,damping_factor)
-		limits=[]             # to divide the number line between 0 and 1 in parts equal to the probabilities
-		links=list(prob_dis)  # stores all the keys of the prob_dis in the same order
-		limits.append(prob_dis[links[0]])
-		for j in range(1,len(links)):
-			limits.append(limits[j-1]+prob_dis[links[j]])
-		limits.append(0.0)	
-		
-		r=random.random()  # returns a random number in [0.0,1.0)
-	
-		for i in range(0,len(limits)-1):
-			if limits[i-1]<=r<limits[i]:
-				page=links[i]
-				PageRanks[page]+=1/n
-				break 
-
-	return PageRanks
+	links = LinkMatrix(corpus)
+	counts = random_walks(links, damping_factor, n, walkers, np.random.default_rng(seed))
+	return links.as_dict(counts / n)
 
-	raise NotImplementedError
 
+def random_walks(links, damping_factor, n, walkers, rng):
+	"""
+	Return how often each page is visited in `n` samples taken by
+	`walkers` surfers that all move one step at a time.
 
-def iterate_pagerank(corpus, damping_factor):
+	Each step takes a single uniform draw `u` per surfer: below
+	`damping_factor` it picks link number `u / damping_factor` of the
+	current page, otherwise it picks page number `(u - damping_factor)
+	/ (1 - damping_factor)` of the corpus. Pages without links send the
+	surfer to a page picked uniformly from the corpus.
+
+	Surfers start at random pages and take BURN_IN unrecorded steps
+	first, so the recorded samples do not overweight the start.
+	"""
+	d = damping_factor
+	N = len(links)
+	counts = np.zeros(N, dtype=np.int64)
+	if N == 0 or n <= 0:
+		return counts
+
+	walkers = max(1, min(walkers, n))
+	pages = rng.integers(N, size=walkers)
+	for _ in range(BURN_IN):
+		pages = step(links, d, pages, rng)
+
+	taken = 0
+	while True:
+		pages = pages[:n - taken]
+		counts += np.bincount(pages, minlength=N)
+		taken += len(pages)
+		if taken >= n:
+			return counts
+		pages = step(links, d, pages, rng)
+
+
+def step(links, damping_factor, pages, rng):
+	"""
+	Return the pages surfers on `pages` move to next.
+	"""
+	d = damping_factor
+	N = len(links)
+	u = rng.random(len(pages))
+	degree = links.out_degree[pages]
+
+	# Scale the part of [0, 1) each outcome owns back up to [0, 1)
+	follow = (u < d) & (degree > 0)
+	jump = np.where(u < d, u / d if d > 0 else 0, (u - d) / (1 - d) if d < 1 else 0)
+	following = pages[follow]
+	choice = np.minimum((jump[follow] * degree[follow]).astype(np.int64), degree[follow] - 1)
+
+	next_pages = np.minimum((jump * N).astype(np.int64), N - 1)
+	next_pages[follow] = links.out_links[links.out_indptr[following] + choice]
+	return next_pages
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                     method="jacobi"):
 	"""
 	Return PageRank values for each page by iteratively updating
 	PageRank values until convergence.
 
+	`method` picks the solver, one of SOLVERS.
+
 	Return a dictionary where keys are page names, and values are
 	their estimated PageRank value (a value between 0 and 1). All
 	PageRank values should sum to 1.
 	"""
-	def sigma(PageRanks,corpus,p):           # function to find the sigma term for page p
-		linking_pages=[]
-		for page in corpus:
-			if p in corpus[page]:
-				linking_pages.append(page)
-		sigma=0
-		for i in linking_pages:
-			sigma+=PageRanks[i]/len(corpus[i])
-		return sigma
+	if method not in SOLVERS:
+		raise ValueError(f"Unknown PageRank method '{method}'")
+	links = LinkMatrix(corpus)
+	ranks, _ = SOLVERS[method](links, damping_factor, tolerance, max_iterations)
+	return links.as_dict(ranks)
 
 
-	d=damping_factor
-	N=len(corpus)
-	PageRanks=dict()
-	for key in corpus:
-		PageRanks[key]=1/N
+def update_pagerank(corpus, damping_factor, ranks, changes, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, local=False):
+	"""
+	Return PageRank values for `corpus` after some of its links changed,
+	reusing `ranks`, the values computed before the change.
+
+	`changes` maps every page whose links changed to its (old links,
+	new links), as returned by `diff_corpus`. Power iteration restarts
+	from `ranks` rather than from the uniform distribution. If `local`
+	is true and no page was added or removed, the ranks are instead
+	corrected by pushing the error the changes caused from page to page
+	along the links, which touches only the pages near the changes.
+
+	Either way the result is within about `tolerance` (L1 norm) of
+	what `iterate_pagerank` computes from scratch.
+	"""
+	links = LinkMatrix(corpus)
+	N = len(links)
+	if N == 0:
+		return {}
+	start = np.fromiter((ranks.get(page, 1 / N) for page in links.pages), dtype=float, count=N)
+
+	if local and len(ranks) == N and all(page in ranks for page in links.pages):
+		affected = set()
+		for page, (old_links, new_links) in changes.items():
+			affected.update(old_links, new_links)
+		affected = [links.index[page] for page in affected if page in links.index]
+
+		# Pages without links before the changes, whose rank `ranks` spread evenly
+		dangling = set(links.dangling.tolist())
+		for page, (old_links, new_links) in changes.items():
+			if not old_links:
+				dangling.add(links.index[page])
+			elif not new_links:
+				dangling.discard(links.index[page])
+		dangling = start[list(dangling)].sum()
+
+		new_ranks = push_updates(links, damping_factor, start, affected, tolerance, dangling)
+	else:
+		new_ranks, _ = power_iteration(links, damping_factor, tolerance, max_iterations, start / start.sum())
+	return links.as_dict(new_ranks)
+
+
+def diff_corpus(old, new):
+	"""
+	Return a dictionary mapping every page whose links differ between
+	corpus `old` and corpus `new` to its (old links, new links).
+	Pages only in one of them have no links in the other.
+	"""
+	changes = dict()
+	for page in old.keys() | new.keys():
+		old_links = old.get(page, set())
+		new_links = new.get(page, set())
+		if old_links != new_links or (page in old) != (page in new):
+			changes[page] = (old_links, new_links)
+	return changes
 
-	new_PRs=dict()	
 
-	while True:
-		
-		for page in PageRanks:
-			new_PRs[page]=(1-d)/N + d*sigma(PageRanks,corpus,page)
-		
-		if all((-0.001<new_PRs[page]-PageRanks[page]<0.001) for page in PageRanks):
+def push_updates(links, damping_factor, ranks, affected, tolerance=TOLERANCE, dangling=None):
+	"""
+	Return `ranks`, the converged ranks of a corpus before some links
+	changed, corrected for the new `links`.
+
+	Only the pages in `affected` may have gained or lost rank from
+	their in-links. Their error (residual) is added to their rank and
+	passed on to their out-links, round after round, until no page
+	holds more than `tolerance * (1 - damping_factor) / N`, which bounds
+	the total error by `tolerance`.
+
+	Residual leaving dangling pages, or changes to their total rank,
+	reach every page equally. Settling an equal residual on every page
+	adds a multiple of the ranks themselves, so it is left to the final
+	normalization instead of being pushed. For that, the residuals are
+	computed with `dangling`, the total rank of the pages that had no
+	links before the change (by default, those without links now), as
+	the unaffected pages' ranks were.
+	"""
+	d = damping_factor
+	N = len(links)
+	ranks = ranks.copy()
+	residual = np.zeros(N)
+	threshold = tolerance * (1 - d) / N
+
+	share = np.divide(ranks, links.out_degree, out=np.zeros(N), where=links.out_degree > 0)
+	if dangling is None:
+		dangling = ranks[links.dangling].sum()
+	dangling /= N
+	pages = np.unique(np.asarray(affected, dtype=np.int64))
+	for page in pages:
+		sources = links.sources[links.indptr[page]:links.indptr[page + 1]]
+		residual[page] = (1 - d) / N + d * (share[sources].sum() + dangling) - ranks[page]
+	pages = pages[np.abs(residual[pages]) > threshold]
+
+	while len(pages):
+		pushed = residual[pages]
+		residual[pages] = 0
+		ranks[pages] += pushed
+
+		# Gather the out-links of every pushed page
+		degrees = links.out_degree[pages]
+		first = np.cumsum(degrees) - degrees
+		edges = np.repeat(links.out_indptr[pages] - first, degrees) + np.arange(degrees.sum())
+		targets, position = np.unique(links.out_links[edges], return_inverse=True)
+		weights = np.repeat(np.divide(d * pushed, degrees, out=np.zeros(len(pages)), where=degrees > 0), degrees)
+		residual[targets] += np.bincount(position, weights=weights, minlength=len(targets))
+
+		pages = targets[np.abs(residual[targets]) > threshold]
+
+	return ranks / ranks.sum()
+
+
+def personalized_pagerank(links, damping_factor, teleports, tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS):
+	"""
+	Return personalized PageRank values of the pages in `links`, a
+	LinkMatrix, for every teleport distribution in `teleports`.
+
+	Each teleport distribution maps pages to weights: with probability
+	`1 - damping_factor` the surfer jumps to a page picked in proportion
+	to them instead of uniformly. The distributions are solved together
+	in blocks of PERSONALIZED_BLOCK by `personalized_iteration`, sharing
+	one sparse matrix product per sweep (see `LinkMatrix.in_links`).
+
+	Return a list with one dictionary of PageRank values per teleport
+	distribution, in the same order.
+	"""
+	N = len(links)
+	results = []
+	for low in range(0, len(teleports), PERSONALIZED_BLOCK):
+		block = teleports[low:low + PERSONALIZED_BLOCK]
+		teleport = np.zeros((N, len(block)))
+		for column, weights in enumerate(block):
+			for page, weight in weights.items():
+				teleport[links.index[page], column] = weight
+		total = teleport.sum(axis=0)
+		if np.any(total <= 0):
+			raise ValueError("Every teleport distribution needs a positive weight")
+		ranks, _ = personalized_iteration(links, damping_factor, teleport / total, tolerance, max_iterations)
+		results.extend(links.as_dict(ranks[:, column]) for column in range(len(block)))
+	return results
+
+
+def personalized_iteration(links, damping_factor, teleport, tolerance=TOLERANCE,
+                           max_iterations=MAX_ITERATIONS):
+	"""
+	Run power iteration over `links` for every column of `teleport`, an
+	N x K matrix of teleport distributions. Each column stops as soon as
+	it moves less than `tolerance` in total, as it would on its own, and
+	leaves the block, so later sweeps only carry the columns still
+	moving. All columns stop after `max_iterations` sweeps.
+
+	Return (ranks, iterations), where `ranks` is an N x K matrix and
+	`iterations` the sweeps taken by the slowest column.
+	"""
+	d = damping_factor
+	N = len(links)
+	result = teleport.copy()
+	ranks = teleport.copy()
+	base = (1 - d) * teleport
+	active = np.arange(teleport.shape[1])
+
+	for iteration in range(1, max_iterations + 1):
+		new_ranks = links.spread_many(ranks)
+
+		# Finish the sweep a few rows at a time, so each chunk stays in
+		# cache, measuring the change of every column (L1 norm) with the
+		# old ranks as scratch space
+		delta = np.zeros(len(active))
+		rows = max(1, PERSONALIZED_CHUNK // len(active))
+		for low in range(0, N, rows):
+			chunk = new_ranks[low:low + rows]
+			chunk *= d
+			chunk += base[low:low + rows]
+			old = ranks[low:low + rows]
+			np.subtract(chunk, old, out=old)
+			np.abs(old, out=old)
+			delta += old.sum(axis=0)
+		ranks = new_ranks
+
+		done = delta < tolerance
+		if done.any():
+			result[:, active[done]] = ranks[:, done]
+			active, ranks, base = active[~done], ranks[:, ~done], base[:, ~done]
+			if not len(active):
+				break
+
+	result[:, active] = ranks
+	return result, iteration
+
+
+class LinkMatrix():
+	"""
+	Link structure of a corpus, with pages numbered in corpus order.
+
+	In-links are stored in compressed sparse row form: the pages
+	linking to page `i` are `sources[indptr[i]:indptr[i + 1]]`, and
+	`targets` repeats each `i` once per in-link, so that edge `k`
+	runs from `sources[k]` to `targets[k]`. Out-links are stored the
+	same way: page `i` links to `out_links[out_indptr[i]:out_indptr[i + 1]]`.
+
+	Pages without links (`dangling`) are not stored as linking to
+	every page; their rank is spread as a single sum instead.
+	"""
+
+	def __init__(self, corpus):
+		self.pages = list(corpus)
+		self.index = {page: i for i, page in enumerate(self.pages)}
+		n = len(self.pages)
+
+		degrees = np.fromiter((len(links) for links in corpus.values()), dtype=np.int64, count=n)
+		sources = np.repeat(np.arange(n), degrees)
+		targets = np.fromiter(
+			map(self.index.__getitem__, itertools.chain.from_iterable(corpus.values())),
+			dtype=np.int64, count=int(degrees.sum())
+		)
+
+		self.out_links = targets
+		self.out_indptr = np.zeros(n + 1, dtype=np.int64)
+		np.cumsum(degrees, out=self.out_indptr[1:])
+
+		order = np.argsort(targets, kind="stable")
+		self.sources = sources[order]
+		self.targets = targets[order]
+		self.indptr = np.zeros(n + 1, dtype=np.int64)
+		np.cumsum(np.bincount(self.targets, minlength=n), out=self.indptr[1:])
+		self.out_degree = degrees
+		self.dangling = np.flatnonzero(degrees == 0)
+
+	def __len__(self):
+		return len(self.pages)
+
+	def spread(self, ranks):
+		"""
+		Returns, for every page, the sum of rank / out-degree
+		over the pages linking to it, plus an equal share of the
+		rank of the dangling pages, which link to every page.
+		"""
+		share = np.divide(ranks, self.out_degree, out=np.zeros(len(self)), where=self.out_degree > 0)
+		spread = np.bincount(self.targets, weights=share[self.sources], minlength=len(self))
+		return spread + ranks[self.dangling].sum() / len(self)
+
+	def spread_many(self, ranks):
+		"""
+		Like `spread`, for an N x K matrix of ranks with one rank vector
+		per column, as one sparse matrix product with `in_links`.
+		"""
+		spread = self.in_links @ ranks
+		spread += ranks[self.dangling].sum(axis=0) / len(self)
+		return spread
+
+	@functools.cached_property
+	def in_links(self):
+		"""
+		Sparse N x N matrix whose row `i` holds 1 / out-degree for every
+		page linking to page `i`, built on first use.
+		"""
+		weights = 1 / self.out_degree[self.sources]
+		return sparse.csr_matrix((weights, self.sources, self.indptr), shape=(len(self), len(self)))
+
+	def as_dict(self, ranks):
+		return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+class EdgeFile():
+	"""
+	Link structure of a corpus, memory-mapped from an edge file written
+	by `crawl_edges`, for corpora whose links do not fit in memory.
+
+	The file holds EDGES_HEADER, then one (source, target) pair of
+	EDGE_TYPE page numbers per link, then the out-degree of every page,
+	then the page names separated by NUL bytes. Like a LinkMatrix, it can
+	`spread` ranks, which streams the links EDGE_BLOCK at a time, so
+	only vectors of one number per page are kept in memory.
+	"""
+
+	def __init__(self, path):
+		with open(path, "rb") as f:
+			magic, pages, edges = EDGES_HEADER.unpack(f.read(EDGES_HEADER.size))
+			if magic != EDGES_MAGIC:
+				raise ValueError(f"{path} is not a PageRank edge file")
+			degrees_offset = EDGES_HEADER.size + 2 * edges * np.dtype(EDGE_TYPE).itemsize
+			f.seek(degrees_offset + pages * np.dtype(EDGE_TYPE).itemsize)
+			names = f.read()
+		self.pages = [name.decode("utf-8") for name in names.split(b"\0")] if pages else []
+		self.edges = np.memmap(path, dtype=EDGE_TYPE, mode="r", offset=EDGES_HEADER.size, shape=(edges, 2))
+		self.out_degree = np.fromfile(path, dtype=EDGE_TYPE, count=pages, offset=degrees_offset).astype(np.int64)
+		self.dangling = np.flatnonzero(self.out_degree == 0)
+
+	def __len__(self):
+		return len(self.pages)
+
+	def spread(self, ranks):
+		"""
+		Returns, for every page, the sum of rank / out-degree
+		over the pages linking to it, plus an equal share of the
+		rank of the dangling pages, which link to every page.
+		"""
+		share = np.divide(ranks, self.out_degree, out=np.zeros(len(self)), where=self.out_degree > 0)
+		spread = np.full(len(self), ranks[self.dangling].sum() / len(self))
+		for low in range(0, len(self.edges), EDGE_BLOCK):
+			block = np.asarray(self.edges[low:low + EDGE_BLOCK])
+			spread += np.bincount(block[:, 1], weights=share[block[:, 0]], minlength=len(self))
+		return spread
+
+	def as_dict(self, ranks):
+		return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+def iterate_edges(path, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+	"""
+	Return PageRank values like `iterate_pagerank`, for the corpus
+	whose links `crawl_edges` wrote to the edge file at `path`.
+	"""
+	links = EdgeFile(path)
+	ranks, _ = power_iteration(links, damping_factor, tolerance, max_iterations)
+	return links.as_dict(ranks)
+
+
+def power_iteration(links, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, start=None):
+	"""
+	Run PageRank power iteration over `links` from the ranks `start`,
+	or the uniform distribution, until the ranks move less than
+	`tolerance` in total or `max_iterations` sweeps are done.
+
+	Return (ranks, iterations), where `ranks` is an array in page order.
+	"""
+	d = damping_factor
+	N = len(links)
+	if N == 0:
+		return np.zeros(0), 0
+	ranks = np.full(N, 1 / N) if start is None else start
+
+	for iteration in range(1, max_iterations + 1):
+		new_ranks = (1 - d) / N + d * links.spread(ranks)
+		delta = np.abs(new_ranks - ranks).sum()
+		ranks = new_ranks
+		if delta < tolerance:
 			break
-		
-		for page in PageRanks:
-			PageRanks[page]=new_PRs[page]
 
-	return new_PRs		
+	return ranks, iteration
 
-	raise NotImplementedError
+
+def gauss_seidel(links, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, start=None):
+	"""
+	Like `power_iteration`, but updates the ranks in place, one block
+	of up to SEIDEL_BLOCK pages at a time, so every block already sees
+	the new ranks of the blocks before it in the same sweep, including
+	the running total of dangling rank. Small corpora are still split
+	into several blocks. Every sweep ends with a `rescale`.
+	"""
+	d = damping_factor
+	N = len(links)
+	if N == 0:
+		return np.zeros(0), 0
+	ranks = np.full(N, 1 / N) if start is None else start.copy()
+	degrees = links.out_degree
+	share = np.divide(ranks, degrees, out=np.zeros(N), where=degrees > 0)
+	size = max(1, min(SEIDEL_BLOCK, N // SEIDEL_BLOCKS))
+
+	for iteration in range(1, max_iterations + 1):
+		delta = 0
+		dangling = ranks[links.dangling].sum()
+		for low in range(0, N, size):
+			high = min(low + size, N)
+			edges = slice(links.indptr[low], links.indptr[high])
+			block = (1 - d) / N + d * (np.bincount(
+				links.targets[edges] - low, weights=share[links.sources[edges]], minlength=high - low
+			) + dangling / N)
+			change = block - ranks[low:high]
+			delta += np.abs(change).sum()
+			dangling += change[degrees[low:high] == 0].sum()
+			ranks[low:high] = block
+			np.divide(block, degrees[low:high], out=share[low:high], where=degrees[low:high] > 0)
+		rescale(ranks, share)
+		if delta < tolerance:
+			break
+
+	return ranks, iteration
+
+
+def rescale(ranks, share):
+	"""
+	Scale `ranks` and their per-link `share` in place to sum to 1.
+
+	A Jacobi sweep keeps the total rank, but updating only some pages
+	does not, and the error along the dominant eigenvector then decays
+	only as fast as `damping_factor ** k`.
+	"""
+	total = ranks.sum()
+	if total > 0:
+		ranks /= total
+		share /= total
+
+
+def extrapolated_iteration(links, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                           start=None):
+	"""
+	Like `power_iteration`, but every EXTRAPOLATE_EVERY sweeps replaces
+	the ranks with the quadratic extrapolation of the last four iterates
+	(Kamvar et al.), which cancels out the two slowest decaying error
+	terms.
+	"""
+	d = damping_factor
+	N = len(links)
+	if N == 0:
+		return np.zeros(0), 0
+	ranks = np.full(N, 1 / N) if start is None else start
+	history = [ranks]
+
+	for iteration in range(1, max_iterations + 1):
+		new_ranks = (1 - d) / N + d * links.spread(ranks)
+		delta = np.abs(new_ranks - ranks).sum()
+		ranks = new_ranks
+		if delta < tolerance:
+			break
+		history = history[-3:] + [ranks]
+		if iteration % EXTRAPOLATE_EVERY == 0 and len(history) == 4:
+			ranks = quadratic_extrapolation(*history)
+			history = [ranks]
+
+	return ranks, iteration
+
+
+def quadratic_extrapolation(x0, x1, x2, x3):
+	"""
+	Return the extrapolated limit of four successive iterates, assuming
+	their error is spanned by the two slowest decaying eigenvectors.
+	The result keeps the total rank of `x3`, and `x3` itself is kept
+	if the extrapolation goes negative anywhere.
+	"""
+	y = np.column_stack((x1 - x0, x2 - x0))
+	gamma, *_ = np.linalg.lstsq(y, x0 - x3, rcond=None)
+	g1, g2 = gamma
+	extrapolated = (g1 + g2 + 1) * x1 + (g2 + 1) * x2 + x3
+	total = extrapolated.sum()
+	if total <= 0 or not np.all(np.isfinite(extrapolated)):
+		return x3
+	extrapolated *= x3.sum() / total
+	return extrapolated if np.all(extrapolated >= 0) else x3
+
+
+def adaptive_iteration(links, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                       start=None):
+	"""
+	Like `power_iteration`, but stops updating pages once their rank
+	moves less than `tolerance / N` in a sweep. Their frozen ranks still
+	feed the pages that are left, so later sweeps only recompute the
+	in-links of pages that have not converged yet. Every ADAPTIVE_REFRESH
+	sweeps, and before stopping, a full sweep unfreezes any page that
+	has started moving again. Every sweep ends with a `rescale`.
+	"""
+	d = damping_factor
+	N = len(links)
+	if N == 0:
+		return np.zeros(0), 0
+	ranks = np.full(N, 1 / N) if start is None else start.copy()
+	degrees = links.out_degree
+	share = np.divide(ranks, degrees, out=np.zeros(N), where=degrees > 0)
+	everyone = np.arange(N)
+	active = everyone
+
+	for iteration in range(1, max_iterations + 1):
+		# Gather the in-links of every active page
+		counts = links.indptr[active + 1] - links.indptr[active]
+		first = np.cumsum(counts) - counts
+		edges = np.repeat(links.indptr[active] - first, counts) + np.arange(counts.sum())
+		new_ranks = (1 - d) / N + d * (np.bincount(
+			np.repeat(np.arange(len(active)), counts), weights=share[links.sources[edges]], minlength=len(active)
+		) + ranks[links.dangling].sum() / N)
+
+		change = np.abs(new_ranks - ranks[active])
+		ranks[active] = new_ranks
+		share[active] = np.divide(new_ranks, degrees[active], out=np.zeros(len(active)), where=degrees[active] > 0)
+		rescale(ranks, share)
+
+		full = len(active) == N
+		if full and change.sum() < tolerance:
+			break
+		if not full and (change.sum() < tolerance or iteration % ADAPTIVE_REFRESH == 0):
+			active = everyone
+		else:
+			active = active[change >= tolerance / N]
+
+	return ranks, iteration
+
+
+SOLVERS = {
+	"jacobi": power_iteration,
+	"gauss-seidel": gauss_seidel,
+	"extrapolation": extrapolated_iteration,
+	"adaptive": adaptive_iteration,
+}
 
 
 if __name__ == "__main__":